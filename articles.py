@@ -6,18 +6,30 @@ Date:   2020-12-11
 """
 
 import pandas as pd
-import html
-from collections import defaultdict
+import numpy as np
+from collections import defaultdict, Counter
 from datetime import datetime, timedelta
 import matplotlib.pyplot as plt
 import json
 import os
+import pickle
+import hashlib
+import heapq
+from operator import itemgetter
+from itertools import islice
+from array import array
+from concurrent.futures import ProcessPoolExecutor
 
 from utils import *
+from trend_index import DailyTrendIndex, TrendSnapshot, InvertedIndex
+from score_store import ScoreStore, save_score_store
+from instrumentation import instrument
+from rendering import get_chart, render_charts
 
 class Articles:
     
-    def __init__(self, dataframe, stop_words=None, date_range=[], verbose=False):
+    def __init__(self, dataframe, stop_words=None, date_range=[], verbose=False, cache_dir=None,
+                 metrics=None, lazy=False):
         
         self.mandatory_columns = ('DATE', 'TIME', 'TITLE', 'ID', 'TEXT', 
                                   'PLATFORMS', 'TOPICS', 'LANGUAGE')
@@ -29,6 +41,13 @@ class Articles:
         
         self.dataframe = dataframe
         self.verbose = verbose
+        
+        #   instrumentation.PipelineMetrics recording each call (if not None)
+        self.metrics = metrics
+        
+        #   set-based filter for O(1) lookups of stop words
+        if stop_words is not None and not isinstance(stop_words, StopWordFilter):
+            stop_words = StopWordFilter(stop_words)
         self.stop_words = stop_words
         
         if date_range == []:
@@ -38,37 +57,77 @@ class Articles:
             self.min_date = date_range[0]
             self.max_date = date_range[1]
         
+        #   if not set, the date range covers all articles (including added articles)
+        self.date_range_set = date_range != []
+        
         self.tokenized = False
+        self.tokenized_columns = set()
+        self.vocabulary = {}
+        self.vocabulary_tokens = []
+        self.token_ids = {}
+        self.term_matrix = {}
+        self.daily_index = None
+        self.inverted_index = None
         self.trend_count_score = defaultdict(int)
         self.trend_text_score = defaultdict(int)
         self.trend_norm_score = defaultdict(int)
+        self.trend_velocity_score = defaultdict(int)
+        self.trend_store = None
+        self._reset_rankings()
+        
+        #   on-disk cache of pre-processing outputs (keys of the current content of each column)
+        self.cache_dir = cache_dir
+        self.column_keys = {}
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+        
+        #   in lazy mode, pre-processing calls are recorded in the plan and run by collect()
+        self.lazy = lazy
+        self.plan = []
+        self.collected_range = None
+        self._collecting = False
+    
+    @property
+    def dataframe(self):
+        """
+        Dataframe of the articles.  Columns whose last cached stages were only matched
+        (not loaded) by _apply_stage() are loaded from the cache on first access.
+        """
+        
+        for column in list(self.pending_stages):
+            self._load_pending_stage(column)
+        return self._dataframe
+    
+    @dataframe.setter
+    def dataframe(self, dataframe):
+        #   cache keys, interned IDs, matrices and indices of the previous dataframe
+        self._dataframe = dataframe
+        self.pending_stages = {}
+        self.column_keys = {}
+        self.token_ids = {}
+        self.term_matrix = {}
+        self.daily_index = None
+        self.inverted_index = None
     
+    @instrument
     def remove_noise(self, columns):
         """
         Remove common noise in text. (E.g., '\n', '\t', HTML, URLs)
         """
         
+        if self._defer('remove_noise', locals()):
+            return
+        
         for column in columns:
             
-            if column not in self.dataframe.columns:
+            if column not in self._dataframe.columns:
                 raise ValueError('Cannot find ', column, 'column.')
             
+            #   remove \n and \t, convert HTML characters into Unicode and remove URLs
             if self.verbose:
-                print("Removing \\n and \\t...")
-            self.dataframe[column] = [text.replace('\n', '').replace('\t', '') 
-                                      for text in self.dataframe[column]]
-            
-            #   convert HTML characters into Unicode
-            if self.verbose:
-                print("Converting HTML characters to Unicode...")
-            self.dataframe[column] = [html.unescape(text) for text in
-                                      self.dataframe[column]]
-            
-            #   remove URLs
-            if self.verbose:
-                print("Removing URLs...")
-            self.dataframe[column] = [self._remove_url(text) for text in 
-                                      self.dataframe[column]]
+                print("Removing \\n, \\t, HTML characters and URLs...")
+            self._apply_stage(column, 'remove_noise', {}, 
+                              lambda texts: [remove_noise(text) for text in texts])
             
     def _remove_url(self, text):
         """
@@ -76,64 +135,286 @@ class Articles:
         by " ")
         """
         
-        text = ' '.join(token for token in text.split(' ') if not token.startswith('http'))
-        text = ' '.join(token for token in text.split(' ') if not token.startswith('www'))
-        
-        return text
+        return remove_url(text)
     
+    @instrument
     def replace_punctuations(self, columns=[], replacement=" "):
         """
         Replace all punctuations in columns.
         """
         
+        if self._defer('replace_punctuations', locals()):
+            return
+        
         #   replace punctuations
         if self.verbose:
             print("Replacing punctuations with whitespace...")
         
         for column in columns:
-            if column not in self.dataframe.columns:
+            if column not in self._dataframe.columns:
                 raise ValueError('Cannot find ', column, 'column.')
                 
-            self.dataframe[column] = [replace_punctuations(text) for text
-                                      in self.dataframe[column]]
+            self._apply_stage(column, 'replace_punctuations', {'replacement': replacement},
+                              lambda texts: [replace_punctuations(text, replacement) 
+                                             for text in texts])
+        return
+    
+    @instrument
+    def normalize(self, columns, replacement=" ", lower=True):
+        """
+        Remove noise, replace punctuations and lowercase all strings in columns with 
+        one call per string (see utils.normalize_text()).  Same output as 
+        remove_noise() then replace_punctuations().
+        """
+        
+        if self._defer('normalize', locals()):
+            return
+        
+        if self.verbose:
+            print("Normalizing text...")
+        
+        for column in columns:
+            if column not in self._dataframe.columns:
+                raise ValueError('Cannot find ', column, 'column.')
+            
+            self._apply_stage(column, 'normalize', {'replacement': replacement, 'lower': lower},
+                              lambda texts: [normalize_text(text, replacement, lower) 
+                                             for text in texts])
         return
                 
-    def tokenize(self, columns, sep=None, lower=True):
+    @instrument
+    def tokenize(self, columns, sep=None, lower=True, intern=False):
         """
-        Tokenizes all strings in columns.
+        Tokenizes all strings in columns.  If intern, the tokens are stored as integer
+        IDs of self.vocabulary (see intern_tokens()).
         """
         
+        if self._defer('tokenize', locals()):
+            return
+        
         #   tokenize
         if self.verbose:
             print("Tokenizing...")
         
         for column in columns:
-            if column not in self.dataframe.columns:
+            if column not in self._dataframe.columns:
                 raise ValueError('Cannot find ', column, 'column.')
+            
+            if intern:
+                #   tokens of each text are interned right away (the lists are not kept)
+                ids, lengths = self._intern_token_lists(tokenize(text, sep, lower) for text 
+                                                        in self.dataframe[column])
+                self._set_token_ids(column, ids, lengths)
+            else:
+                self._apply_stage(column, 'tokenize', {'sep': sep, 'lower': lower},
+                                  lambda texts: [tokenize(text, sep, lower) for text in texts])
+                self.token_ids.pop(column, None)
+            self._invalidate_columns([column])
+        
+        self.tokenized_columns.update(columns)
+        self.tokenized = True
+        return
+    
+    @instrument
+    def preprocess(self, columns, replacement=" ", sep=None, lower=True, workers=1, 
+                   chunk_size=1000, intern=False, executor=None):
+        """
+        Remove noise, replace punctuations, tokenize and remove stop words in columns
+        with one call per text.  Same output as calling each step separately.
+        INPUT:
+            - columns (List[str]):              name of columns
+            - replacement (str):                replacement of punctuations
+            - sep (str):                        separator of tokens (if None, whitespace)
+            - lower (bool):                     lowercase tokens
+            - workers (int):                    number of worker processes (if None, number of CPUs)
+            - chunk_size (int):                 number of texts sent to a worker at a time
+            - intern (bool):                    store tokens as integer IDs (see intern_tokens())
+            - executor (Executor):              process pool initialized with 
+                                                utils.init_preprocess_worker(self.stop_words) to 
+                                                use instead of a new one (e.g., across calls)
+        """
+        
+        if self._defer('preprocess', locals()):
+            return
+        
+        if self.verbose:
+            print("Pre-processing...")
+        
+        for column in columns:
+            if column not in self._dataframe.columns:
+                raise ValueError('Cannot find ', column, 'column.')
+        
+        if self.stop_words is None:
+            print("Stop words not loaded.")
+        
+        if workers is None:
+            workers = os.cpu_count()
+        
+        params = {'replacement': replacement, 'sep': sep, 'lower': lower,
+                  'stop_words': self._get_stop_words_key()}
+        
+        if workers == 1 and executor is None:
+            for column in columns:
+                self._apply_stage(column, 'preprocess', params,
+                                  lambda texts: [preprocess_text(text, self.stop_words, 
+                                                                 replacement, sep, lower)
+                                                 for text in texts])
+        else:
+            #   stop words are sent once to each worker instead of with every chunk
+            own_executor = executor is None
+            if own_executor:
+                executor = ProcessPoolExecutor(max_workers=workers, 
+                                               initializer=init_preprocess_worker,
+                                               initargs=(self.stop_words,))
+            
+            def preprocess_texts(texts):
+                chunks = [texts[i:i+chunk_size] for i in range(0, len(texts), chunk_size)]
                 
-            self.dataframe[column] = [tokenize(text) for text 
-                                      in self.dataframe[column]]
+                tokens = []
+                for chunk_tokens in executor.map(preprocess_chunk, chunks,
+                                                 [replacement]*len(chunks),
+                                                 [sep]*len(chunks), [lower]*len(chunks)):
+                    tokens.extend(chunk_tokens)
+                return tokens
+            
+            try:
+                for column in columns:
+                    self._apply_stage(column, 'preprocess', params, preprocess_texts)
+            finally:
+                if own_executor:
+                    executor.shutdown()
         
+        for column in columns:
+            self.token_ids.pop(column, None)
+        self._invalidate_columns(columns)
+        self.tokenized_columns.update(columns)
         self.tokenized = True
+        
+        if intern:
+            self.intern_tokens(columns)
+        return
+    
+    @instrument
+    def intern_tokens(self, columns):
+        """
+        Store the tokens of columns as integer IDs of the shared self.vocabulary.  The
+        IDs of a column are kept in a flat array with offsets (self.token_ids[column]),
+        and each cell of the column becomes a view of its IDs (instead of a list of 
+        str).  remove_stop_words() and compute_trend() work directly on the IDs.
+        """
+        
+        if self._defer('intern_tokens', locals()):
+            return
+        
+        if self.tokenized is False:
+            print("Please tokenize first.")
+            return
+        
+        for column in columns:
+            if column not in self._dataframe.columns:
+                raise ValueError('Cannot find ', column, 'column.')
+            
+            if column in self.token_ids:
+                continue
+            
+            ids, lengths = self._intern_token_lists(self.dataframe[column])
+            self._set_token_ids(column, ids, lengths)
+        return
+    
+    def get_token_lists(self, column):
+        """
+        Get the tokens of each row in column as lists of str (decoding interned IDs).
+        """
+        
+        if column not in self.token_ids:
+            return list(self.dataframe[column])
+        
+        return [self._decode_tokens(ids) for ids in self.dataframe[column]]
+    
+    def _decode_tokens(self, ids):
+        """
+        Convert an array of token IDs into a list of tokens.
+        """
+        
+        vocabulary_tokens = self.vocabulary_tokens
+        return [vocabulary_tokens[token_id] for token_id in ids.tolist()]
+    
+    def _intern_token_lists(self, token_lists):
+        """
+        Map token lists to a flat array of vocabulary IDs and the number of tokens in
+        each list.  New tokens are added into the vocabulary.
+        """
+        
+        vocabulary = self.vocabulary
+        ids = array('l')
+        lengths = array('l')
+        
+        for tokens in token_lists:
+            ids.extend([vocabulary.setdefault(token, len(vocabulary)) for token in tokens])
+            lengths.append(len(tokens))
+        
+        self.vocabulary_tokens.extend(islice(vocabulary, len(self.vocabulary_tokens), None))
+        
+        return np.array(ids, dtype=np.int32), np.array(lengths, dtype=np.int64)
+    
+    def _set_token_ids(self, column, ids, lengths):
+        """
+        Store the interned tokens of column and set each cell to a view of its IDs.
+        """
+        
+        offsets = np.zeros(len(lengths)+1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        self.token_ids[column] = {'ids': ids, 'offsets': offsets}
+        self.column_keys.pop(column, None)
+        
+        cells = np.empty(len(lengths), dtype=object)
+        for i in range(len(lengths)):
+            cells[i] = ids[offsets[i]:offsets[i+1]]
+        self.dataframe[column] = cells
         return
     
-    def compute_trend(self, columns, column_weights=[], date_range=[]):
+    @instrument
+    def compute_trend(self, columns, column_weights=[], date_range=[], backend='python', 
+                      reset=True, baseline_range=[], velocity='ratio'):
         """
         Compute trend scores for each unique token found in columns.
         INPUT:
             - columns (List[str]):              name of columns
             - column_weights(List[float]):      weights of columns (if empty, balanced)
             - date_range(list[str]):            min and max date inclusively (modifies self.min_date and self.max_date)
+            - backend(str):                     'python' scores the token lists directly, 'matrix' uses
+                                                the sparse document-term matrix (built once per column),
+                                                'daily' sums the buckets of the per-day index
+            - reset(bool):                      restart scores (if False, add to existing scores)
+            - baseline_range(list[str]):        min and max date of the baseline window of the velocity
+                                                score (if empty, velocity is not computed)
+            - velocity(str):                    'ratio' or 'zscore' (see compute_velocity())
         """
         
+        if backend not in ('python', 'matrix', 'daily'):
+            raise ValueError("Invalid backend.")
+        
         #   restart scores
-        self.trend_count_score = defaultdict(int)
-        self.trend_text_score = defaultdict(int)
-        self.trend_norm_score = defaultdict(int)
+        if reset:
+            self.trend_count_score = defaultdict(int)
+            self.trend_text_score = defaultdict(int)
+            self.trend_norm_score = defaultdict(int)
+            self.trend_velocity_score = defaultdict(int)
+        self.trend_store = None
+        self._reset_rankings()
         
         if self.verbose:
             print("Computing trend...")
         
+        #   in lazy mode, only pre-process columns within the date ranges
+        if date_range != []:
+            date_ranges = [date_range]
+        else:
+            date_ranges = [[self.min_date, self.max_date]]
+        if baseline_range != []:
+            date_ranges.append(baseline_range)
+        self._collect_plan(columns, date_ranges)
+        
         if self.tokenized is False:
             print("Please tokenized.")
             return
@@ -151,13 +432,28 @@ class Articles:
         if date_range != []:
             self.min_date = date_range[0]
             self.max_date = date_range[1]
+            self.date_range_set = True
         
         if self.verbose:
             print("Date range ", self.min_date, " ", self.max_date)
+        
+        if baseline_range != []:
+            self.compute_velocity(columns, column_weights, baseline_range=baseline_range,
+                                  velocity=velocity)
+        
+        if backend == 'daily':
+            self._compute_trend_daily(columns, column_weights)
+            return
             
         mask = (self.dataframe['DATE'] >= self.min_date) & \
             (self.dataframe['DATE'] <= self.max_date)
         
+        #   interned columns are scored from their IDs
+        if backend == 'matrix' or (backend == 'python' and 
+                                   any(column in self.token_ids for column in columns)):
+            self._compute_trend_matrix(columns, column_weights, mask)
+            return
+        
         for i, column in enumerate(columns):
             
             if i < len(column_weights):
@@ -165,40 +461,757 @@ class Articles:
             else:
                 weight = None
             
-            if column not in self.dataframe.loc[mask].columns:
+            if column not in self._dataframe.columns:
                 raise ValueError('Cannot find ', column, 'column.')
             
-            for tokens in self.dataframe.loc[mask][column]:
+            for tokens in self.dataframe.loc[mask, column]:
                 self._compute_trend(tokens, weight)
         return
 
     
     def _compute_trend(self, tokens, weight=None):
         """
-        Add the following tokens into the scores.
+        Add the following tokens into the scores.  Each text is counted in a single
+        pass and all 3 scores are updated once per unique token.
         """
-        existing_tokens = set()
         
         if weight is None:
             weight = 1
         
-        for token in tokens:            
+        counts = Counter(tokens)
+        num_tokens = len(tokens)
+        
+        #   fractional weights are added once per occurrence so that the float sums
+        #   are identical to adding each occurrence separately
+        exact_multiple = float(weight).is_integer()
+        
+        for token, count in counts.items():
             #   add each occurrence of token
-            self.trend_count_score[token] += 1 * weight
+            if exact_multiple or count == 1:
+                self.trend_count_score[token] += count * weight
+            else:
+                score = self.trend_count_score[token]
+                for _ in range(count):
+                    score += weight
+                self.trend_count_score[token] = score
+            #   add each text with token
+            self.trend_text_score[token] += 1 * weight
+            #   add normalized score for each token in text
+            self.trend_norm_score[token] += count/num_tokens * weight
+    
+    @instrument
+    def build_term_matrix(self, columns):
+        """
+        Build a sparse (CSR) document-term matrix for each tokenized column.  All
+        columns share the integer vocabulary in self.vocabulary.  Each matrix is a
+        dict of numpy arrays:
+            - indptr:   row i occupies indices[indptr[i]:indptr[i+1]]
+            - indices:  vocabulary id of each unique token in the row
+            - data:     number of occurrences of each unique token in the row
+            - lengths:  number of tokens in each row
+        """
+        
+        self.collect(columns)
+        
+        if self.verbose:
+            print("Building document-term matrix...")
+        
+        if self.tokenized is False:
+            print("Please tokenize first.")
+            return
+        
+        vocabulary = self.vocabulary
+        
+        for column in columns:
+            if column not in self._dataframe.columns:
+                raise ValueError('Cannot find ', column, 'column.')
+            
+            if column in self.token_ids:
+                self.term_matrix[column] = self._build_term_matrix_ids(column)
+                continue
+            
+            indptr = [0]
+            indices = []
+            data = []
+            lengths = []
+            
+            for tokens in self.dataframe[column]:
+                counts = Counter(tokens)
+                indices.extend([vocabulary.setdefault(token, len(vocabulary)) 
+                                for token in counts])
+                data.extend(counts.values())
+                indptr.append(len(indices))
+                lengths.append(len(tokens))
+            
+            self.term_matrix[column] = {'indptr': np.array(indptr, dtype=np.int64),
+                                        'indices': np.array(indices, dtype=np.int64),
+                                        'data': np.array(data, dtype=np.int64),
+                                        'lengths': np.array(lengths, dtype=np.int64)}
+        
+        #   token of each vocabulary id
+        self.vocabulary_tokens = list(vocabulary)
+        return
+    
+    def _build_term_matrix_ids(self, column):
+        """
+        Build the document-term matrix of an interned column with numpy.  Tokens of
+        each row are kept in order of first occurrence (same as Counter).
+        """
+        
+        ids = self.token_ids[column]['ids'].astype(np.int64)
+        lengths = np.diff(self.token_ids[column]['offsets'])
+        num_rows = len(lengths)
+        num_tokens = max(len(self.vocabulary), 1)
+        
+        #   unique (row, token) pairs ordered by their first occurrence
+        keys = np.repeat(np.arange(num_rows, dtype=np.int64), lengths) * num_tokens + ids
+        unique_keys, first_index, counts = np.unique(keys, return_index=True, 
+                                                     return_counts=True)
+        order = np.argsort(first_index, kind='stable')
+        unique_keys = unique_keys[order]
+        
+        indptr = np.zeros(num_rows+1, dtype=np.int64)
+        np.cumsum(np.bincount(unique_keys // num_tokens, minlength=num_rows), out=indptr[1:])
+        
+        return {'indptr': indptr,
+                'indices': unique_keys % num_tokens,
+                'data': counts[order].astype(np.int64),
+                'lengths': lengths}
+    
+    def _compute_trend_matrix(self, columns, column_weights, mask):
+        """
+        Compute the trend scores as weighted column sums of the document-term 
+        matrix over the rows in mask.
+        """
+        
+        for column in columns:
+            if column not in self._dataframe.columns:
+                raise ValueError('Cannot find ', column, 'column.')
+        
+        missing_columns = [column for column in columns if column not in self.term_matrix]
+        if missing_columns != []:
+            self.build_term_matrix(missing_columns)
+        
+        num_tokens = len(self.vocabulary)
+        count_score = np.zeros(num_tokens)
+        text_score = np.zeros(num_tokens)
+        norm_score = np.zeros(num_tokens)
+        row_mask = np.asarray(mask, dtype=bool)
+        selected_ids = []
+        
+        for i, column in enumerate(columns):
+            
+            if i < len(column_weights):
+                weight = column_weights[i]
+            else:
+                weight = 1
+            
+            matrix = self.term_matrix[column]
+            row_nnz = np.diff(matrix['indptr'])
+            #   expand the row mask to the non-zero entries of each row
+            entry_mask = np.repeat(row_mask, row_nnz)
+            
+            ids = matrix['indices'][entry_mask]
+            counts = matrix['data'][entry_mask]
+            lengths = np.repeat(matrix['lengths'], row_nnz)[entry_mask]
+            
+            count_score += np.bincount(ids, weights=counts * weight, minlength=num_tokens)
+            text_score += np.bincount(ids, minlength=num_tokens) * weight
+            norm_score += np.bincount(ids, weights=counts / lengths * weight, 
+                                      minlength=num_tokens)
+            selected_ids.append(ids)
+        
+        #   keep the tokens in order of first occurrence (same order as the python backend)
+        selected_ids = np.concatenate(selected_ids) if selected_ids != [] else np.array([], dtype=np.int64)
+        unique_ids, first_index = np.unique(selected_ids, return_index=True)
+        ordered_ids = unique_ids[np.argsort(first_index, kind='stable')]
+        
+        tokens = [self.vocabulary_tokens[token_id] for token_id in ordered_ids.tolist()]
+        
+        if len(column_weights) == 0:
+            count_values = count_score[ordered_ids].astype(np.int64).tolist()
+            text_values = text_score[ordered_ids].astype(np.int64).tolist()
+        else:
+            count_values = count_score[ordered_ids].tolist()
+            text_values = text_score[ordered_ids].tolist()
+        
+        for token, count, text, norm in zip(tokens, count_values, text_values, 
+                                            norm_score[ordered_ids].tolist()):
+            self.trend_count_score[token] += count
+            self.trend_text_score[token] += text
+            self.trend_norm_score[token] += norm
+        return
+    
+    @instrument
+    def build_daily_index(self, columns):
+        """
+        Index the partial trend scores of columns for each DATE, such that the scores
+        of any date range are the sum of its day buckets.
+        """
+        
+        self.collect(columns)
+        
+        if self.verbose:
+            print("Building daily index...")
+        
+        if self.tokenized is False:
+            print("Please tokenize first.")
+            return
+        
+        if self.daily_index is None:
+            self.daily_index = DailyTrendIndex()
+        else:
+            self.daily_index.remove_columns(columns)
+        
+        self.daily_index.add_dataframe(self.dataframe, columns, self._get_decoders(columns))
+        return
+    
+    @instrument
+    def add_articles(self, dataframe):
+        """
+        Append tokenized articles (pre-processed the same way as self.dataframe) and
+        add them into the daily index.  Only the buckets of their dates are updated.
+        If no date range was set, the date range is widened to cover their dates.
+        """
+        
+        for column in self.mandatory_columns:
+            if column not in dataframe.columns:
+                raise ValueError('Cannot find ', column, ' column.')
+        
+        if not self.date_range_set and dataframe.shape[0] > 0:
+            #   the dates are NaN if self.dataframe was empty
+            dates = pd.concat([pd.Series([self.min_date, self.max_date]), 
+                               dataframe['DATE']]).dropna()
+            self.min_date = dates.min()
+            self.max_date = dates.max()
+        
+        #   intern the new rows of interned columns
+        token_ids = {}
+        for column, interned in self.token_ids.items():
+            ids, lengths = self._intern_token_lists(dataframe[column])
+            token_ids[column] = (np.concatenate([interned['ids'], ids]), 
+                                 np.concatenate([np.diff(interned['offsets']), lengths]))
+        
+        #   the indices are updated with the new rows instead of rebuilt
+        daily_index = self.daily_index
+        inverted_index = self.inverted_index
+        
+        self.dataframe = pd.concat([self.dataframe, dataframe], ignore_index=True)
+        for column, (ids, lengths) in token_ids.items():
+            self._set_token_ids(column, ids, lengths)
+        
+        if daily_index is not None:
+            daily_index.add_dataframe(dataframe, list(daily_index.columns))
+            self.daily_index = daily_index
+        if inverted_index is not None:
+            inverted_index.add_dataframe(dataframe, list(inverted_index.columns))
+            self.inverted_index = inverted_index
+        return
+    
+    @instrument
+    def compute_trends(self, windows, configs):
+        """
+        Compute the trend scores of many date ranges and column-weight configurations
+        from one pass over the tokens (the daily index).  self.trend_*_score are not
+        modified.
+        INPUT:
+            - windows (List[list[str]]):                    min and max date (inclusively) of each window
+            - configs (List[(List[str], List[float])]):     columns and column weights (if empty, 
+                                                            balanced) of each configuration
+        OUTPUT:
+            - trends (dict):    (min_date, max_date, configuration index) to a dict of the 
+                                'count', 'text' and 'norm' scores
+        """
+        
+        #   in lazy mode, only pre-process columns within the windows
+        self._collect_plan([column for columns, _ in configs for column in columns], windows)
+        
+        if self.tokenized is False:
+            print("Please tokenize first.")
+            return
+        
+        #   normalize column weights (from 0 to 1)
+        normalized_configs = []
+        for columns, column_weights in configs:
+            if len(column_weights) != 0 and len(column_weights) != len(columns):
+                raise ValueError('Mismatched column weights.')
+            for column in columns:
+                if column not in self._dataframe.columns:
+                    raise ValueError('Cannot find ', column, 'column.')
+            
+            if len(column_weights) != 0:
+                sum_weights = sum(column_weights)
+                column_weights = [float(weight) / sum_weights for weight in column_weights]
+            normalized_configs.append((list(columns), list(column_weights)))
+        
+        columns = []
+        for config_columns, _ in normalized_configs:
+            columns += [column for column in config_columns if column not in columns]
+        
+        if self.daily_index is None:
+            missing_columns = columns
+        else:
+            missing_columns = [column for column in columns 
+                               if column not in self.daily_index.columns]
+        if missing_columns != []:
+            self.build_daily_index(missing_columns)
+        
+        if self.verbose:
+            print("Computing trends of ", len(windows), " windows and ", len(configs), 
+                  " configurations...")
+        
+        return self.daily_index.compute_trends([tuple(window) for window in windows], 
+                                               normalized_configs)
+    
+    @instrument
+    def compute_velocity(self, columns, column_weights=[], date_range=[], baseline_range=[], 
+                         velocity='ratio', method='text', smoothing=1):
+        """
+        Compute the velocity score of each token, which compares its mean daily score
+        (of method) in the target date_range with a preceding baseline window (burst
+        detection), into self.trend_velocity_score.  The daily scores and baseline
+        statistics are cached in the daily index, so sliding the target window only
+        computes the new days.
+        INPUT:
+            - columns (List[str]):              name of columns
+            - column_weights(List[float]):      weights of columns (if empty, balanced)
+            - date_range(list[str]):            min and max date of the target window (if empty, 
+                                                self.min_date and self.max_date)
+            - baseline_range(list[str]):        min and max date of the baseline window (if empty,
+                                                the window of the same length before date_range)
+            - velocity(str):                    'ratio' of the (smoothed) means, or 'zscore' of the target 
+                                                mean against the baseline mean and standard deviation
+            - method(str):                      daily score compared ('count', 'text' or 'norm')
+            - smoothing(float):                 added to the denominators (and numerator of 'ratio')
+        """
+        
+        if velocity not in ('ratio', 'zscore'):
+            raise ValueError("Invalid velocity.")
+        if method not in ('count', 'text', 'norm'):
+            raise ValueError("Invalid method.")
+        
+        if date_range == []:
+            date_range = [self.min_date, self.max_date]
+        if baseline_range == []:
+            baseline_range = DailyTrendIndex.get_baseline_range(date_range)
+        
+        #   in lazy mode, only pre-process columns within the target and baseline windows
+        self._collect_plan(columns, [date_range, baseline_range])
+        
+        if self.tokenized is False:
+            print("Please tokenize first.")
+            return
+        
+        if len(column_weights) != 0 and len(column_weights) != len(columns):
+            raise ValueError('Mismatched column weights.')
+        for column in columns:
+            if column not in self._dataframe.columns:
+                raise ValueError('Cannot find ', column, 'column.')
+        
+        if len(column_weights) != 0:
+            sum_weights = sum(column_weights)
+            column_weights = [float(weight) / sum_weights for weight in column_weights]
+        
+        if self.daily_index is None:
+            missing_columns = columns
+        else:
+            missing_columns = [column for column in columns 
+                               if column not in self.daily_index.columns]
+        if missing_columns != []:
+            self.build_daily_index(missing_columns)
+        
+        if self.verbose:
+            print("Computing velocity of ", date_range, " against ", baseline_range)
+        
+        self.trend_velocity_score = self.daily_index.compute_velocity(date_range, baseline_range, 
+                                                                      columns, column_weights,
+                                                                      velocity, method, smoothing)
+        self.velocity_trend_rank = None
+        self._trending_cache = {}
+        return
+    
+    @instrument
+    def build_inverted_index(self, columns):
+        """
+        Index the postings (articles, dates and term frequencies) of each token of 
+        columns for get_token_series() and get_top_articles().
+        """
+        
+        self.collect(columns)
+        
+        if self.verbose:
+            print("Building inverted index...")
+        
+        if self.tokenized is False:
+            print("Please tokenize first.")
+            return
+        
+        self.inverted_index = InvertedIndex()
+        self.inverted_index.add_dataframe(self.dataframe, list(columns), self._get_decoders(columns))
+        return
+    
+    def _get_inverted_index(self, columns, column_weights):
+        """
+        Get the inverted index (built if it does not index columns) and the normalized
+        column weights.
+        """
+        
+        if len(column_weights) != 0 and len(column_weights) != len(columns):
+            raise ValueError('Mismatched column weights.')
+        
+        if self.inverted_index is None or \
+                any(column not in self.inverted_index.columns for column in columns):
+            indexed_columns = list(columns)
+            if self.inverted_index is not None:
+                indexed_columns += [column for column in self.inverted_index.columns 
+                                    if column not in indexed_columns]
+            self.build_inverted_index(indexed_columns)
+        
+        if len(column_weights) != 0:
+            sum_weights = sum(column_weights)
+            column_weights = [float(weight) / sum_weights for weight in column_weights]
+        
+        return self.inverted_index, column_weights
+    
+    def get_token_series(self, token, columns, column_weights=[], method='count', date_range=[]):
+        """
+        Get the daily trend score (of method) of token as a list of (date, score) sorted
+        by date, from the inverted index.  Dates without the token are left out.
+        """
+        
+        if method not in ('count', 'text', 'norm'):
+            raise ValueError("Invalid method.")
+        
+        index, column_weights = self._get_inverted_index(columns, column_weights)
+        return index.get_series(token, columns, column_weights, method, date_range)
+    
+    def get_top_articles(self, token, columns, column_weights=[], method='count', n=10, 
+                         date_range=[]):
+        """
+        Get the n articles contributing the most to the trend score (of method) of token
+        as a list of (ID, DATE, score), from the inverted index.
+        """
+        
+        if method not in ('count', 'text', 'norm'):
+            raise ValueError("Invalid method.")
+        
+        index, column_weights = self._get_inverted_index(columns, column_weights)
+        return index.get_top_articles(token, columns, column_weights, method, n, date_range)
+    
+    def _get_decoders(self, columns):
+        """
+        Get the functions converting the cells of interned columns into token lists.
+        """
+        
+        return {column: self._decode_tokens for column in columns if column in self.token_ids}
+    
+    def _compute_trend_daily(self, columns, column_weights):
+        """
+        Compute the trend scores by summing the day buckets within the date range.
+        """
+        
+        for column in columns:
+            if column not in self._dataframe.columns:
+                raise ValueError('Cannot find ', column, 'column.')
+        
+        if self.daily_index is None:
+            missing_columns = columns
+        else:
+            missing_columns = [column for column in columns 
+                               if column not in self.daily_index.columns]
+        if missing_columns != []:
+            self.build_daily_index(missing_columns)
+        
+        self.daily_index.compute_trend(columns, column_weights, [self.min_date, self.max_date],
+                                       scores=(self.trend_count_score, self.trend_text_score,
+                                               self.trend_norm_score))
+        return
+    
+    def _apply_stage(self, column, stage, params, function):
+        """
+        Replace column with function(list of values in column).  If self.cache_dir is
+        set, the output is cached on disk under a key hashed from the content of the
+        column, the stage and its params, and is loaded instead of recomputed when 
+        the key is found.  The hash of the content of the output is cached with it.
+        """
+        
+        if self.cache_dir is None:
+            self.dataframe[column] = function(list(self.dataframe[column]))
+            return
+        
+        #   the content of a column is only known without hashing while its cached output
+        #   is not loaded (and so cannot have been modified since)
+        if column not in self.pending_stages:
+            self.column_keys[column] = self._hash_column(self._dataframe[column])
+        
+        key = hashlib.sha256(json.dumps([self.column_keys[column], stage, params], 
+                                        sort_keys=True).encode()).hexdigest()
+        file = os.path.join(self.cache_dir, key+'.pkl')
+        key_file = os.path.join(self.cache_dir, key+'.key')
+        
+        if os.path.exists(file) and os.path.exists(key_file):
+            #   only loaded when the column is accessed (e.g., a later stage misses)
+            if self.verbose:
+                print("Found ", stage, " of ", column, " in cache.")
+            self.pending_stages[column] = file
+            with open(key_file, 'r') as fp:
+                self.column_keys[column] = fp.read()
+        else:
+            if column in self.pending_stages:
+                self._load_pending_stage(column)
+            self._dataframe[column] = function(list(self._dataframe[column]))
+            self.column_keys[column] = self._hash_column(self._dataframe[column])
+            
+            #   write to temporary files first so that no partial file is left under key
+            #   (the output is only found once its hash is written)
+            with open(file+'.tmp', 'wb') as fp:
+                pickle.dump(list(self._dataframe[column]), fp, protocol=4)
+            os.replace(file+'.tmp', file)
+            with open(key_file+'.tmp', 'w') as fp:
+                fp.write(self.column_keys[column])
+            os.replace(key_file+'.tmp', key_file)
+        return
+    
+    def _load_pending_stage(self, column):
+        """
+        Load the cached output of the last stage of column into the dataframe.
+        """
+        
+        file = self.pending_stages.pop(column)
+        if self.verbose:
+            print("Loading ", column, " from cache...")
+        with open(file, 'rb') as fp:
+            self._dataframe[column] = pickle.load(fp)
+        return
+    
+    def _hash_column(self, values):
+        """
+        Hash the content of a column (vectorized for columns of str).
+        """
+        
+        try:
+            hashes = pd.util.hash_pandas_object(values, index=False).to_numpy()
+            return hashlib.sha256(hashes.tobytes()).hexdigest()
+        except TypeError:
+            #   e.g., lists of tokens
+            return hashlib.sha256(pickle.dumps(list(values), protocol=4)).hexdigest()
+    
+    def _get_stop_words_key(self):
+        """
+        Hash of the stop words (used in cache keys).
+        """
+        
+        if self.stop_words is None:
+            return None
+        return hashlib.sha256('\n'.join(sorted(self.stop_words.words)).encode()).hexdigest()
+    
+    @instrument
+    def compute_trend_snapshot(self, columns, date_range=[]):
+        """
+        Compute a mergeable snapshot (TrendSnapshot) of the unweighted partial trend 
+        scores of columns within date_range (if empty, self.min_date to self.max_date).
+        Snapshots of different shards (e.g., date ranges, files or workers) can be 
+        merged with merge_trend_snapshots().
+        """
+        
+        if date_range == []:
+            date_range = [self.min_date, self.max_date]
+        
+        #   in lazy mode, only pre-process columns within the date range
+        self._collect_plan(columns, [date_range])
+        
+        if self.tokenized is False:
+            print("Please tokenize first.")
+            return
+        
+        mask = (self.dataframe['DATE'] >= date_range[0]) & \
+            (self.dataframe['DATE'] <= date_range[1])
+        
+        snapshot = TrendSnapshot(date_range[0], date_range[1])
+        decoders = self._get_decoders(columns)
+        
+        for column in columns:
+            if column not in self._dataframe.columns:
+                raise ValueError('Cannot find ', column, 'column.')
             
-            if token not in existing_tokens:
-                #   add each text with token
-                self.trend_text_score[token] += 1 * weight
-                #   add normalized score for each token in text
-                self.trend_norm_score[token] += tokens.count(token)/len(tokens) * weight
+            decoder = decoders.get(column)
+            for tokens in self.dataframe.loc[mask, column]:
+                if decoder is not None:
+                    tokens = decoder(tokens)
+                snapshot.add_tokens(column, tokens)
+        
+        return snapshot
+    
+    @instrument
+    def merge_trend_snapshots(self, snapshots, columns, column_weights=[]):
+        """
+        Merge snapshots (from compute_trend_snapshot()) and set the trend scores and 
+        date range to those of the merged snapshot.  column_weights are normalized as
+        in compute_trend().
+        """
+        
+        if len(column_weights) != 0 and len(column_weights) != len(columns):
+            raise ValueError('Mismatched column weights.')
+        
+        merged = TrendSnapshot()
+        for snapshot in snapshots:
+            merged.merge(snapshot)
+        
+        if len(column_weights) != 0:
+            sum_weights = sum(column_weights)
+            column_weights = [float(weight) / sum_weights for weight in column_weights]
+        
+        self.trend_count_score, self.trend_text_score, self.trend_norm_score = \
+            merged.compute_trend(columns, column_weights)
+        self.trend_velocity_score = defaultdict(int)
+        self.min_date = merged.min_date
+        self.max_date = merged.max_date
+        self.trend_store = None
+        self._reset_rankings()
+        return merged
+    
+    def _count_tokens(self, columns):
+        """
+        Count the tokens in the tokenized columns (None if none are tokenized).
+        """
+        
+        num_tokens = None
+        for column in columns:
+            if column not in self.tokenized_columns or column not in self._dataframe.columns:
+                continue
+            if column in self.token_ids:
+                count = int(self.token_ids[column]['offsets'][-1])
+            else:
+                count = int(self.dataframe[column].str.len().sum())
+            num_tokens = (num_tokens or 0) + count
+        
+        return num_tokens
+    
+    def _defer(self, name, arguments):
+        """
+        Record the call of pre-processing step name (with arguments, its locals()) in 
+        the plan if in lazy mode.  Returns True if the call was deferred.
+        """
+        
+        if not self.lazy or self._collecting:
+            return False
+        
+        arguments = {key: value for key, value in arguments.items() if key != 'self'}
+        arguments['columns'] = list(arguments['columns'])
+        self.plan.append((name, arguments))
+        
+        if self.verbose:
+            print("Deferred ", name, " of ", arguments['columns'])
+        return True
+    
+    def collect(self, columns=None, date_range=[]):
+        """
+        Run the pre-processing steps recorded in the plan (in lazy mode).  Rows outside 
+        date_range (if not empty) are dropped before any step runs, and only the steps
+        of columns (if not None) run; the steps of other columns stay in the plan.
+        Scores computed later cannot include the dropped rows.
+        """
+        
+        if self.plan == []:
+            return
+        
+        if date_range != []:
+            self._push_down_date_range(date_range)
+        
+        pending = []
+        self._collecting = True
+        try:
+            for name, arguments in self.plan:
+                if columns is None:
+                    run_columns = arguments['columns']
+                else:
+                    run_columns = [column for column in arguments['columns'] if column in columns]
+                other_columns = [column for column in arguments['columns'] 
+                                 if column not in run_columns]
+                
+                if run_columns != []:
+                    if self.verbose:
+                        print("Running ", name, " of ", run_columns)
+                    getattr(self, name)(**dict(arguments, columns=run_columns))
+                if other_columns != []:
+                    pending.append((name, dict(arguments, columns=other_columns)))
+        finally:
+            self._collecting = False
+        
+        self.plan = pending
+        return
+    
+    def _push_down_date_range(self, date_range):
+        """
+        Drop the rows outside date_range before the pending pre-processing steps run.
+        """
+        
+        if self.collected_range is not None and (date_range[0] < self.collected_range[0] or 
+                                                 date_range[1] > self.collected_range[1]):
+            raise ValueError('Date range is outside of the collected date range.')
         
-            existing_tokens.add(token)
+        mask = (self.dataframe['DATE'] >= date_range[0]) & \
+            (self.dataframe['DATE'] <= date_range[1])
+        self.collected_range = [date_range[0], date_range[1]]
+        if mask.all():
+            return
+        
+        if self.verbose:
+            print("Dropping ", int((~mask).sum()), " rows outside of ", date_range)
+        
+        interned_columns = list(self.token_ids)
+        self.dataframe = self.dataframe.loc[mask]
+        
+        #   cells of interned columns are views of the IDs of the remaining rows
+        for column in interned_columns:
+            cells = list(self.dataframe[column])
+            ids = np.concatenate(cells) if cells != [] else np.zeros(0, dtype=np.int32)
+            self._set_token_ids(column, ids.astype(np.int32), [len(cell) for cell in cells])
+        return
+    
+    def _collect_plan(self, columns, date_ranges):
+        """
+        Run the steps of the plan needed for the scores of columns within the union of
+        date_ranges.
+        """
+        
+        date_range = [min(date_range[0] for date_range in date_ranges),
+                      max(date_range[1] for date_range in date_ranges)]
+        
+        #   rows outside of the collected date range were dropped
+        if self.collected_range is not None and (date_range[0] < self.collected_range[0] or 
+                                                 date_range[1] > self.collected_range[1]):
+            raise ValueError('Date range is outside of the collected date range.')
+        
+        if self.plan == []:
+            return
+        
+        self.collect(columns, date_range)
+        return
     
+    def _invalidate_columns(self, columns):
+        """
+        Drop the document-term matrices and daily index of columns that were modified.
+        """
+        
+        for column in columns:
+            self.term_matrix.pop(column, None)
+        
+        if self.daily_index is not None:
+            self.daily_index.remove_columns(columns)
+        if self.inverted_index is not None:
+            self.inverted_index = None
+        return
+    
+    @instrument
     def remove_stop_words(self, columns):
         """
         Removes all stop words in columns.  Stop words include tokens containing digits.
         """
         
+        if self._defer('remove_stop_words', locals()):
+            return
+        
         #   remove stop words
         if self.verbose:
             print("Removing stop words...")
@@ -212,16 +1225,43 @@ class Articles:
             return
         
         for column in columns:
-            if column not in self.dataframe.columns:
+            if column not in self._dataframe.columns:
                 raise ValueError('Cannot find ', column, 'column.')
+            
+            if column in self.token_ids:
+                self._remove_stop_word_ids(column)
+                self._invalidate_columns([column])
+                continue
                 
-            self.dataframe[column] = [remove_stop_words(tokens, self.stop_words) 
-                                            for tokens in self.dataframe[column]]
+            self._apply_stage(column, 'remove_stop_words', 
+                              {'stop_words': self._get_stop_words_key()},
+                              lambda token_lists: [remove_stop_words(tokens, self.stop_words) 
+                                                   for tokens in token_lists])
+            self._invalidate_columns([column])
         return
         
+    def _remove_stop_word_ids(self, column):
+        """
+        Remove stop words from an interned column with a mask over the vocabulary.
+        """
+        
+        is_stop_word = np.array([token in self.stop_words for token in self.vocabulary_tokens],
+                                dtype=bool)
+        
+        ids = self.token_ids[column]['ids']
+        offsets = self.token_ids[column]['offsets']
+        keep = ~is_stop_word[ids]
+        
+        #   number of kept tokens before each offset gives the new offsets
+        kept = np.zeros(len(ids)+1, dtype=np.int64)
+        np.cumsum(keep, out=kept[1:])
+        self._set_token_ids(column, ids[keep], np.diff(kept[offsets]))
+        return
+    
     def lemmatize(self, columns):
         raise NotImplementedError()
     
+    @instrument
     def load_dataframe(self, file):
         """
         Read dataframe from .csv file.
@@ -229,17 +1269,68 @@ class Articles:
         self.dataframe = pd.read_csv(file)
         return
             
+    @instrument
     def save_dataframe(self, save_loc="", name="articles_dataframe.csv"):
         """
-        Save dataframe to .csv file.
+        Save dataframe to .csv file.  Interned columns are saved as lists of tokens.
         """
+        self.collect()
+        
+        dataframe = self.dataframe
+        if self.token_ids != {}:
+            dataframe = dataframe.assign(**{column: self.get_token_lists(column) 
+                                            for column in self.token_ids})
         
         if save_loc == "":
-            self.dataframe.to_csv("./"+name)
+            dataframe.to_csv("./"+name)
         else:
-            self.dataframe.to_csv(save_loc+"/"+name)
+            dataframe.to_csv(save_loc+"/"+name)
+        return
+    
+    @instrument
+    def load_parquet(self, file, columns=None, date_range=[]):
+        """
+        Read dataframe from .parquet file (written by save_parquet()).  Tokenized
+        columns are restored as lists of tokens.
+        INPUT:
+            - file (str):                       .parquet file
+            - columns (List[str]):              columns to read (if None, all columns)
+            - date_range(list[str]):            min and max date inclusively to read (if empty, all dates)
+        """
+        
+        self.dataframe, tokenized_columns = read_parquet(file, columns, date_range)
+        self.tokenized_columns = set(tokenized_columns)
+        self.tokenized = len(tokenized_columns) > 0
+        
+        if date_range != []:
+            self.min_date = date_range[0]
+            self.max_date = date_range[1]
+            self.date_range_set = True
         return
     
+    @instrument
+    def save_parquet(self, save_loc="", name="articles_dataframe.parquet"):
+        """
+        Save dataframe to .parquet file.  Tokenized columns are stored as lists of 
+        tokens.
+        """
+        
+        self.collect()
+        
+        if save_loc == "":
+            save_loc = "."
+        
+        dataframe = self.dataframe
+        if self.token_ids != {}:
+            dataframe = dataframe.assign(**{column: self.get_token_lists(column) 
+                                            for column in self.token_ids})
+        
+        write_parquet(dataframe, save_loc+"/"+name, 
+                      [column for column in self.tokenized_columns 
+                       if column in self._dataframe.columns])
+        return
+    
+    @instrument
     def save_trend_scores(self, save_loc="", date_prefix=True):
         """
         Save trend score of each token into .json files.
@@ -263,6 +1354,7 @@ class Articles:
         
         return
     
+    @instrument
     def load_trend_scores(self, method, file, date_prefix=True):
         """
         Load trend scores from file.
@@ -282,57 +1374,173 @@ class Articles:
             if self.verbose:
                 print("Date range changed to ", self.min_date, " to ", self.max_date)
             
+        #   the store (if any) has the scores of another date range
+        self.trend_store = None
+        
         with open(file, 'r') as fp:
             if method == "count":
-                self.trend_count_score = json.load(fp)
+                self.trend_count_score = defaultdict(int, json.load(fp))
             elif method == "text":
-                self.trend_text_score = json.load(fp)
+                self.trend_text_score = defaultdict(int, json.load(fp))
             else:
-                self.trend_norm_score = json.load(fp)
+                self.trend_norm_score = defaultdict(int, json.load(fp))
         
+        self._reset_rankings()
         return
         
-    def rank_tokens(self):
+    @instrument
+    def save_trend_store(self, save_loc="", date_prefix=True, name="trend_scores.bin"):
         """
-        Sort the unique tokens based on their trend scores.
+        Save the trend scores of all 3 methods, the date range and the tokens into a 
+        single binary store file (see score_store.py).
         """
-                
+        
+        if save_loc == "":
+            save_loc = "."
+        
+        if date_prefix:
+            prefix = str(self.min_date) + "_" + str(self.max_date) + "_"
+        else:
+            prefix = ""
+        
+        save_score_store(save_loc+'/'+prefix+name, self.trend_count_score, 
+                         self.trend_text_score, self.trend_norm_score, 
+                         self.min_date, self.max_date)
+        return
+    
+    @instrument
+    def load_trend_store(self, file, methods=[]):
+        """
+        Memory-map a binary store file as self.trend_store and set the date range from
+        it.  Only the scores of methods are read into self.trend_<method>_score; the
+        other methods are looked up from the store (e.g., by get_trending_words()).
+        """
+        
+        for method in methods:
+            if method not in ("count", "norm", "text"):
+                raise ValueError("Invalid method.")
+        
+        self.trend_store = ScoreStore(file)
+        self.min_date = self.trend_store.min_date
+        self.max_date = self.trend_store.max_date
+        if self.verbose:
+            print("Date range changed to ", self.min_date, " to ", self.max_date)
+        
+        self.trend_count_score = defaultdict(int)
+        self.trend_text_score = defaultdict(int)
+        self.trend_norm_score = defaultdict(int)
+        self.trend_velocity_score = defaultdict(int)
+        for method in methods:
+            getattr(self, 'trend_'+method+'_score').update(self.trend_store.get_scores(method))
+        
+        self._reset_rankings()
+        return
+    
+    def get_trend_score(self, token, method='count'):
+        """
+        Get the trend score of token using the specified method (None if it has no score).
+        """
+        
+        if method not in ('count', 'text', 'norm', 'velocity'):
+            raise ValueError("Invalid method.")
+        
+        scores = getattr(self, 'trend_'+method+'_score')
+        if len(scores) == 0 and self.trend_store is not None and method != 'velocity':
+            return self.trend_store.get_score(token, method)
+        
+        return scores.get(token)
+    
+    @instrument
+    def rank_tokens(self, method=None):
+        """
+        Sort the unique tokens based on their trend scores (of method, if not None).
+        """
+        
+        if method is not None and method not in ('count', 'text', 'norm', 'velocity'):
+            raise ValueError("Invalid method.")
+        
         #   sort the tokens based on scores
-        self.count_trend_rank = [pair for pair in sorted(self.trend_count_score.items(), key=lambda item: item[1], reverse=True)]
-        self.text_trend_rank = [pair for pair in sorted(self.trend_text_score.items(), key=lambda item: item[1], reverse=True)]
-        self.norm_trend_rank = [pair for pair in sorted(self.trend_norm_score.items(), key=lambda item: item[1], reverse=True)]
+        if method in (None, 'count'):
+            self.count_trend_rank = [pair for pair in sorted(self.trend_count_score.items(), key=lambda item: item[1], reverse=True)]
+        if method in (None, 'text'):
+            self.text_trend_rank = [pair for pair in sorted(self.trend_text_score.items(), key=lambda item: item[1], reverse=True)]
+        if method in (None, 'norm'):
+            self.norm_trend_rank = [pair for pair in sorted(self.trend_norm_score.items(), key=lambda item: item[1], reverse=True)]
+        if method in (None, 'velocity'):
+            self.velocity_trend_rank = [pair for pair in sorted(self.trend_velocity_score.items(), key=lambda item: item[1], reverse=True)]
      
         return
+    
+    def _reset_rankings(self):
+        """
+        Clear the rankings and cached trending words (when the scores change).
+        """
+        
+        self.count_trend_rank = None
+        self.text_trend_rank = None
+        self.norm_trend_rank = None
+        self.velocity_trend_rank = None
+        self._trending_cache = {}
+        return
 
+    @instrument
     def get_trending_words(self, method='count', n=10, top=True):
         """
-        Get the top n trending words (and scores) using the specified method.
+        Get the top n trending words (and scores) using the specified method.  If the
+        tokens of method are not ranked, only the top (or bottom) n are selected with 
+        a heap.  Results are cached until the scores change.
         """
         
-        if method not in ('count', 'text', 'norm'):
+        if method not in ('count', 'text', 'norm', 'velocity'):
             raise ValueError("Invalid method.")
         
-        if top:
-            if method == 'count' :
-                return self.count_trend_rank[:n]
-            elif method == 'text':
-                return self.text_trend_rank[:n]
-            
-            return self.norm_trend_rank[:n]
+        rank = getattr(self, method+'_trend_rank')
         
-        if method == 'count' :
-            return self.count_trend_rank[-n:]
-        elif method == 'text':
-            return self.text_trend_rank[-n:]
+        #   scores which were not read from the store are looked up from it
+        if rank is None and self.trend_store is not None and method != 'velocity' and \
+                len(getattr(self, 'trend_'+method+'_score')) == 0:
+            return self.trend_store.get_trending_words(method, n, top)
         
-        return self.norm_trend_rank[-n:]
+        if rank is None and n <= 0:
+            self.rank_tokens(method)
+            rank = getattr(self, method+'_trend_rank')
+        
+        if rank is not None:
+            if top:
+                return rank[:n]
+            return rank[-n:]
+        
+        if (method, n, top) not in self._trending_cache:
+            self._trending_cache[(method, n, top)] = \
+                self._select_trending_words(getattr(self, 'trend_'+method+'_score'), n, top)
+        
+        return list(self._trending_cache[(method, n, top)])
     
-    def plot_trends(self, method='count', n=10, top=True, save_file=""):
+    @staticmethod
+    def _select_trending_words(scores, n=10, top=True):
         """
-        Plot the top (or bottom) n trending words and their respective scores.
+        Select the top (or bottom) n tokens of scores with a heap, in the same order as
+        sorting all tokens descendingly.
         """
         
-        if method not in ('count', 'text', 'norm'):
+        items = list(scores.items())
+        
+        if top:
+            #   same order as sorting descendingly (ties are in insertion order)
+            return heapq.nlargest(n, items, key=itemgetter(1))
+        
+        #   n smallest with later insertions first among ties, reversed to descending
+        positions = heapq.nsmallest(n, range(len(items)), key=lambda i: (items[i][1], -i))
+        return [items[i] for i in reversed(positions)]
+    
+    @instrument
+    def plot_trends(self, method='count', n=10, top=True, save_file="", dpi=1200):
+        """
+        Plot the top (or bottom) n trending words and their respective scores.  For
+        many charts without display, use render_trends().
+        """
+        
+        if method not in ('count', 'text', 'norm', 'velocity'):
             raise ValueError("Invalid method.")
         
         rank = self.get_trending_words(method, n, top)
@@ -355,9 +1563,71 @@ class Articles:
         plt.xlabel('words')
         plt.ylabel(method+' score')
         plt.xticks(rotation=45)
+        
+        #   save before show(), which clears the figure
+        if save_file != "":
+            plt.savefig(save_file, format="png", dpi=dpi, bbox_inches="tight")
         plt.show()
     
-        if save_file != "":
-            plt.savefig(save_file, format="png", dpi=1200, bbox_inches="tight")
+    @instrument
+    def render_trends(self, methods=['count'], n=10, top=True, trends=None, save_loc=None,
+                      dpi=100, format='png', workers=1):
+        """
+        Render the bar charts of the top (or bottom) n trending words of each method 
+        without pyplot (see rendering.py), e.g., for batch reports.
+        INPUT:
+            - methods (List[str]):      methods to plot
+            - n (int):                  number of words in each chart
+            - top (bool):               top (or bottom) trending words
+            - trends (dict):            scores of many windows from compute_trends() (if None, 
+                                        the current scores)
+            - save_loc (str):           directory to write the images to (if None, the images
+                                        are returned)
+            - dpi (int):                resolution of the images
+            - format (str):             format of the images (e.g., 'png', 'svg')
+            - workers (int):            number of worker processes (if None, number of CPUs)
+        OUTPUT:
+            - images (dict):            method (or (min_date, max_date, configuration index, 
+                                        method) of trends) to the image (bytes) or its file
+        """
+        
+        for method in methods:
+            if method not in ('count', 'text', 'norm', 'velocity'):
+                raise ValueError("Invalid method.")
+            if trends is not None and method == 'velocity':
+                raise ValueError("Invalid method.")
+        
+        if save_loc == "":
+            save_loc = "."
+        
+        keys = []
+        charts = []
+        if trends is None:
+            for method in methods:
+                if save_loc is not None:
+                    file = save_loc+'/'+str(self.min_date)+'_'+str(self.max_date)+'_'+method+'.'+format
+                else:
+                    file = None
+                keys.append(method)
+                charts.append(get_chart(self.get_trending_words(method, n, top), method, n, top,
+                                        self.min_date, self.max_date, file))
+        else:
+            for (min_date, max_date, i), scores in trends.items():
+                for method in methods:
+                    if save_loc is not None:
+                        file = save_loc+'/'+str(min_date)+'_'+str(max_date)+'_'+str(i)+'_'+method+'.'+format
+                    else:
+                        file = None
+                    keys.append((min_date, max_date, i, method))
+                    charts.append(get_chart(self._select_trending_words(scores[method], n, top), 
+                                            method, n, top, min_date, max_date, file))
+        
+        if self.verbose:
+            print("Rendering ", len(charts), " charts...")
+        
+        images = render_charts(charts, dpi=dpi, format=format, workers=workers)
+        
+        return {key: image if chart['file'] is None else chart['file'] 
+                for key, chart, image in zip(keys, charts, images)}
         
     
\ No newline at end of file
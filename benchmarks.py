@@ -0,0 +1,401 @@
+"""
+Benchmarks of the pre-processing and trend computation toolkit.
+
+Name:   Arnold YS Yeung
+Date:   2026-10-17
+"""
+
+import os
+import sys
+import json
+import random
+import timeit
+import time
+import tracemalloc
+import platform
+import html
+import re
+
+import numpy as np
+import pandas as pd
+
+from utils import normalize_text, StopWordFilter
+from tr_preprocessing import TRArticles
+from articles import Articles
+
+
+VOCABULARY = ['said', 'percent', 'market', 'bank', 'oil', 'prices', 'shares', 'government',
+              'billion', 'million', 'year', 'rate', 'trade', 'china', 'euro', 'dollar',
+              'growth', 'stocks', 'investors', 'central', 'economy', 'deal', 'company',
+              'reuters', 'quarter', 'profit', 'sales', 'analysts', 'bonds', 'yield']
+PUNCTUATIONS = [',', '.', ';', ':', '(', ')', '"', "'s", '-', '$', '%']
+ENTITIES = ['&amp;', '&lt;', '&gt;', '&quot;', '&#39;', '&nbsp;']
+URLS = ['http://www.reuters.com', 'https://example.com/news?id=1', 'www.reuters.com/article']
+
+#   columns of the raw TR .csv files (e.g., ./rna002_RTRS_2013_06.csv)
+TR_COLUMNS = ['DATE', 'TIME', 'UNIQUE_STORY_INDEX', 'EVENT_TYPE', 'PNAC', 'STORY_DATE_TIME',
+              'TAKE_DATE_TIME', 'HEADLINE_ALERT_TEXT', 'ACCUMULATED_STORY_TEXT', 'TAKE_TEXT',
+              'PRODUCTS', 'TOPICS', 'RELATED_RICS', 'NAMED_ITEMS', 'HEADLINE_SUBTYPE',
+              'STORY_TYPE', 'TABULAR_FLAG', 'ATTRIBUTION', 'LANGUAGE']
+HEADLINE_INTERNAL_CALLS = ["Test, Please Ignore", "SERVICE ALERT", "THIS IS A TEST MESSAGE"]
+PRODUCT_INTERNAL_CALLS = ["XX", "TEST"]
+PRODUCTS = ['E', 'U', 'M', 'RNP', 'PSC', 'DNP', 'LDC', 'BSW', 'RWS', 'GRO']
+TOPICS = ['LEN', 'RTRS', 'BACT', 'BUS', 'US', 'MCE', 'ENER', 'CRU', 'FRX', 'STX', 'DBT', 'ASIA']
+
+#   re-formatting of the notebook as a TRArticles.reformat() spec
+TR_SPEC = {'identifier': 'UNIQUE_STORY_INDEX',
+           'fill_columns': ['HEADLINE_ALERT_TEXT', 'ACCUMULATED_STORY_TEXT', 'TAKE_TEXT'],
+           'internal_calls': {'HEADLINE_ALERT_TEXT': HEADLINE_INTERNAL_CALLS,
+                              'PRODUCTS': PRODUCT_INTERNAL_CALLS},
+           'set_columns': ['PRODUCTS', 'TOPICS'],
+           'concatenate_columns': ['ACCUMULATED_STORY_TEXT', 'TAKE_TEXT'],
+           'rename': {'DATE': 'DATE', 'TIME': 'TIME', 'UNIQUE_STORY_INDEX': 'ID',
+                      'HEADLINE_ALERT_TEXT': 'TITLE', 'ACCUMULATED_STORY_TEXT': 'TEXT',
+                      'TAKE_TEXT': 'TEXT2', 'PRODUCTS': 'PLATFORMS', 'TOPICS': 'TOPICS',
+                      'LANGUAGE': 'LANGUAGE'},
+           'drop_columns': ['EVENT_TYPE', 'PNAC', 'STORY_DATE_TIME', 'TAKE_DATE_TIME', 
+                            'STORY_TYPE', 'HEADLINE_SUBTYPE', 'NAMED_ITEMS', 'TABULAR_FLAG',
+                            'ATTRIBUTION', 'RELATED_RICS']}
+TEXT_COLUMNS = ['TITLE', 'TEXT']
+COLUMN_WEIGHTS = [5, 1]
+
+
+#   size of the generated vocabulary (VOCABULARY and rare words)
+MAX_WORDS = 20000
+
+def _get_rare_word(index):
+    #   letters only, as tokens with digits are removed as stop words
+    word = ''
+    while index > 0:
+        index, letter = divmod(index, 26)
+        word += chr(ord('a') + letter)
+    return 'x' + word
+
+def generate_text(num_words, seed=None):
+    """
+    Generate a Reuters-like article body of num_words words with punctuations,
+    numbers, HTML characters, URLs, newlines and tabs.
+    """
+    rng = random.Random(seed)
+    words = []
+    for _ in range(num_words):
+        #   skewed (Zipf-like) word frequencies with a long tail of rare words
+        index = min(int(rng.paretovariate(1.2)) - 1, MAX_WORDS - 1)
+        word = VOCABULARY[index] if index < len(VOCABULARY) else _get_rare_word(index)
+        roll = rng.random()
+        if roll < 0.02:
+            word = rng.choice(ENTITIES)
+        elif roll < 0.03:
+            word = rng.choice(URLS)
+        elif roll < 0.08:
+            word = str(rng.randint(1, 2020))
+        elif roll < 0.25:
+            word += rng.choice(PUNCTUATIONS)
+        elif roll < 0.28:
+            word = word.capitalize() + '\n'
+        elif roll < 0.29:
+            word += '\t'
+        words.append(word)
+
+    return ' '.join(words)
+
+def _normalize_chain(text):
+    """
+    Reference chain of remove_noise(), _remove_url() and replace_punctuations()
+    before the precompiled normalizer.
+    """
+    text = text.replace('\n', '').replace('\t', '')
+    text = html.unescape(text)
+    text = ' '.join(token for token in text.split(' ') if not token.startswith('http'))
+    text = ' '.join(token for token in text.split(' ') if not token.startswith('www'))
+    text = re.sub(r'[^0-9a-zA-Z]+', " ", text)
+
+    return text.lower()
+
+def _get_dates(num_dates, start_date):
+    return [str(date.date()) for date in pd.date_range(start_date, periods=num_dates)]
+
+def generate_tr_dataframe(num_stories, num_words=300, num_dates=30, start_date='2013-06-01', 
+                          seed=None):
+    """
+    Generate a raw TR-format dataframe of num_stories stories.  Each story has 1 to
+    4 takes (rows with the same UNIQUE_STORY_INDEX) whose headline and text are 
+    only in some of the takes, ~10% of stories are not in English and ~3% are
+    internal calls (test entries, service alerts).
+    """
+    rng = random.Random(seed)
+    dates = _get_dates(num_dates, start_date)
+    
+    rows = []
+    for story in range(num_stories):
+        story_id = 'nL1N' + format(story, '07d')
+        date = dates[story * num_dates // max(num_stories, 1)]
+        language = 'EN' if rng.random() < 0.9 else rng.choice(['DE', 'FR', 'JA'])
+        products = ' '.join(rng.sample(PRODUCTS, rng.randint(1, 3)))
+        headline = generate_text(rng.randint(5, 15), rng.random())
+        
+        roll = rng.random()
+        if roll < 0.02:
+            headline = rng.choice(HEADLINE_INTERNAL_CALLS) + ' ' + headline
+        elif roll < 0.03:
+            products = rng.choice(PRODUCT_INTERNAL_CALLS) + ' ' + products
+        
+        for take in range(rng.randint(1, 4)):
+            time_of_day = '%02d:%02d:%02d.%03d' % (rng.randint(0, 23), rng.randint(0, 59),
+                                                    rng.randint(0, 59), rng.randint(0, 999))
+            rows.append({'DATE': date,
+                         'TIME': time_of_day,
+                         'UNIQUE_STORY_INDEX': story_id,
+                         'EVENT_TYPE': 'STORY_TAKE_OVERWRITE' if take > 0 else 'ALERT',
+                         'PNAC': story_id,
+                         'STORY_DATE_TIME': date + ' ' + time_of_day,
+                         'TAKE_DATE_TIME': date + ' ' + time_of_day,
+                         'HEADLINE_ALERT_TEXT': headline if take == 0 or rng.random() < 0.5 else None,
+                         'ACCUMULATED_STORY_TEXT': generate_text(num_words, rng.random()) 
+                             if take > 0 else None,
+                         'TAKE_TEXT': generate_text(num_words // 4, rng.random()) 
+                             if rng.random() < 0.7 else None,
+                         'PRODUCTS': products,
+                         'TOPICS': ' '.join(rng.sample(TOPICS, rng.randint(1, 4))),
+                         'RELATED_RICS': None,
+                         'NAMED_ITEMS': None,
+                         'HEADLINE_SUBTYPE': None,
+                         'STORY_TYPE': 'S',
+                         'TABULAR_FLAG': False,
+                         'ATTRIBUTION': 'RTRS',
+                         'LANGUAGE': language})
+    
+    return pd.DataFrame(rows, columns=TR_COLUMNS)
+
+def generate_articles_dataframe(num_articles, num_words=300, num_dates=30, 
+                                start_date='2013-06-01', seed=None):
+    """
+    Generate an 'Article'-format dataframe (the output of TRArticles.reformat()) of
+    num_articles articles.
+    """
+    rng = random.Random(seed)
+    dates = _get_dates(num_dates, start_date)
+    
+    rows = []
+    for article in range(num_articles):
+        rows.append({'DATE': dates[article * num_dates // max(num_articles, 1)],
+                     'TIME': '%02d:%02d:%02d' % (rng.randint(0, 23), rng.randint(0, 59), 
+                                                 rng.randint(0, 59)),
+                     'ID': 'nL1N' + format(article, '07d'),
+                     'TITLE': generate_text(rng.randint(5, 15), rng.random()),
+                     'TEXT': generate_text(num_words, rng.random()),
+                     'PLATFORMS': set(rng.sample(PRODUCTS, rng.randint(1, 3))),
+                     'TOPICS': set(rng.sample(TOPICS, rng.randint(1, 4))),
+                     'LANGUAGE': 'EN'})
+    
+    return pd.DataFrame(rows)
+
+def _get_stop_words():
+    directory = os.path.dirname(os.path.abspath(__file__))
+    return StopWordFilter.from_files([directory+'/StopWords', directory+'/AddStopWords'])
+
+#   benchmarked steps:  (name, function, names of the steps run before it)
+TR_STEPS = [
+    ('filter_language', lambda tr: tr.filter_language(), []),
+    ('remove_duplicate_ids', lambda tr: tr.remove_duplicate_ids(TR_SPEC['identifier'], 
+                                                                 TR_SPEC['fill_columns']), 
+     ['filter_language']),
+    ('remove_internal_calls', lambda tr: [tr.remove_internal_calls(column, calls) for column, calls 
+                                          in TR_SPEC['internal_calls'].items()],
+     ['filter_language', 'remove_duplicate_ids']),
+    ('convert_string_to_set', lambda tr: tr.convert_string_to_set(TR_SPEC['set_columns']),
+     ['filter_language', 'remove_duplicate_ids', 'remove_internal_calls']),
+    ('concatenate_columns', lambda tr: tr.concatenate_columns(TR_SPEC['concatenate_columns'], 
+                                                              remove=True),
+     ['filter_language', 'remove_duplicate_ids', 'remove_internal_calls', 
+      'convert_string_to_set']),
+    ('reformat_dataframe', lambda tr: tr.reformat_dataframe(TR_SPEC['rename'], 
+                                                            TR_SPEC['drop_columns'], keep=True),
+     ['filter_language', 'remove_duplicate_ids', 'remove_internal_calls', 
+      'convert_string_to_set', 'concatenate_columns']),
+    ('reformat', lambda tr: tr.reformat(TR_SPEC, keep=True), []),
+]
+
+ARTICLES_STEPS = [
+    ('remove_noise', lambda articles: articles.remove_noise(TEXT_COLUMNS), []),
+    ('replace_punctuations', lambda articles: articles.replace_punctuations(TEXT_COLUMNS), 
+     ['remove_noise']),
+    ('tokenize', lambda articles: articles.tokenize(TEXT_COLUMNS), 
+     ['remove_noise', 'replace_punctuations']),
+    ('remove_stop_words', lambda articles: articles.remove_stop_words(TEXT_COLUMNS), 
+     ['remove_noise', 'replace_punctuations', 'tokenize']),
+    ('normalize', lambda articles: articles.normalize(TEXT_COLUMNS), []),
+    ('preprocess', lambda articles: articles.preprocess(TEXT_COLUMNS), []),
+    ('compute_trend', lambda articles: articles.compute_trend(TEXT_COLUMNS, list(COLUMN_WEIGHTS)),
+     ['preprocess']),
+    ('compute_trend_matrix', lambda articles: articles.compute_trend(TEXT_COLUMNS, list(COLUMN_WEIGHTS),
+                                                                     backend='matrix'),
+     ['preprocess']),
+    ('compute_trend_daily', lambda articles: articles.compute_trend(TEXT_COLUMNS, list(COLUMN_WEIGHTS),
+                                                                    backend='daily'),
+     ['preprocess']),
+    ('rank_tokens', lambda articles: articles.rank_tokens(), ['preprocess', 'compute_trend']),
+    ('get_trending_words', lambda articles: articles.get_trending_words('norm', n=20),
+     ['preprocess', 'compute_trend']),
+]
+
+def _benchmark_steps(create, steps, repeat=3):
+    """
+    Time (best of repeat) and measure the peak memory (allocated with tracemalloc,
+    in a separate run) of each step on a new object from create() on which the
+    steps before it were run.  Returns a list of results.
+    """
+    functions = {name: function for name, function, _ in steps}
+    
+    def setup(before):
+        obj = create()
+        for name in before:
+            functions[name](obj)
+        return obj
+    
+    results = []
+    for name, function, before in steps:
+        times = []
+        for _ in range(repeat):
+            obj = setup(before)
+            rows_in = obj.dataframe.shape[0]
+            start = time.perf_counter()
+            function(obj)
+            times.append(time.perf_counter() - start)
+        
+        obj = setup(before)
+        tracemalloc.start()
+        function(obj)
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        
+        results.append({'method': name, 'rows_in': rows_in, 'rows_out': obj.dataframe.shape[0],
+                        'time': min(times), 'mean_time': sum(times) / len(times),
+                        'peak_memory': peak_memory})
+    
+    return results
+
+def benchmark_tr_articles(num_stories, num_words=300, repeat=3, seed=0):
+    """
+    Benchmark each TRArticles method (and reformat()) on a generated raw dataframe.
+    """
+    dataframe = generate_tr_dataframe(num_stories, num_words, seed=seed)
+    return _benchmark_steps(lambda: TRArticles(dataframe.copy(), ['EN']), TR_STEPS, repeat)
+
+def benchmark_articles(num_articles, num_words=300, repeat=3, seed=0):
+    """
+    Benchmark each Articles method (and compute_trend() with each backend) on a 
+    generated 'Article'-format dataframe.
+    """
+    dataframe = generate_articles_dataframe(num_articles, num_words, seed=seed)
+    stop_words = _get_stop_words()
+    return _benchmark_steps(lambda: Articles(dataframe.copy(), stop_words=stop_words), 
+                            ARTICLES_STEPS, repeat)
+
+def _same_scores(scores, other_scores):
+    """
+    Check that two dicts of scores have the same non-zero scores (up to float error).
+    """
+    scores = {token: score for token, score in scores.items() if score != 0}
+    other_scores = {token: score for token, score in other_scores.items() if score != 0}
+    if scores.keys() != other_scores.keys():
+        return False
+    return all(abs(score - other_scores[token]) <= 1e-9 * max(1., abs(score)) 
+               for token, score in scores.items())
+
+def check_outputs(size, num_words=300, seed=0):
+    """
+    Check that the fused and optimized methods give the same outputs as the steps
+    they replace on generated corpora of size stories / articles:  reformat() and
+    the TRArticles steps, preprocess() and the Articles steps, and compute_trend()
+    with each backend.  Raises a ValueError if an output differs.
+    """
+    functions = {name: function for name, function, _ in TR_STEPS + ARTICLES_STEPS}
+    
+    dataframe = generate_tr_dataframe(size, num_words, seed=seed)
+    tr_articles = TRArticles(dataframe.copy(), ['EN'])
+    for name, _, _ in TR_STEPS[:-1]:
+        functions[name](tr_articles)
+    if not TRArticles(dataframe, ['EN']).reformat(TR_SPEC).equals(tr_articles.dataframe):
+        raise ValueError('reformat() output differs from the steps.')
+    
+    dataframe = generate_articles_dataframe(size, num_words, seed=seed)
+    stop_words = _get_stop_words()
+    articles = Articles(dataframe.copy(), stop_words=stop_words)
+    for name in ['remove_noise', 'replace_punctuations', 'tokenize', 'remove_stop_words']:
+        functions[name](articles)
+    fused_articles = Articles(dataframe, stop_words=stop_words)
+    fused_articles.preprocess(TEXT_COLUMNS)
+    if not fused_articles.dataframe.equals(articles.dataframe):
+        raise ValueError('preprocess() output differs from the steps.')
+    
+    articles.compute_trend(TEXT_COLUMNS, list(COLUMN_WEIGHTS))
+    for backend in ['matrix', 'daily']:
+        fused_articles.compute_trend(TEXT_COLUMNS, list(COLUMN_WEIGHTS), backend=backend)
+        for method in ['count', 'text', 'norm']:
+            if not _same_scores(getattr(fused_articles, 'trend_'+method+'_score'), 
+                                getattr(articles, 'trend_'+method+'_score')):
+                raise ValueError('compute_trend() scores of the '+backend+' backend differ.')
+    return
+
+def run_benchmarks(sizes=[1000, 10000], num_words=300, repeat=3, seed=0, 
+                   output="benchmark_results.json", check=True):
+    """
+    Run the TRArticles and Articles benchmarks on corpora of each size (number of 
+    stories / articles) and write the results to output (.json) if not None.
+    If check, the outputs of the benchmarked methods are first checked with 
+    check_outputs().  Returns the results.
+    """
+    results = {'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+               'python': platform.python_version(),
+               'pandas': pd.__version__,
+               'numpy': np.__version__,
+               'platform': platform.platform(),
+               'num_words': num_words,
+               'repeat': repeat,
+               'seed': seed,
+               'benchmarks': []}
+    
+    for size in sizes:
+        if check:
+            check_outputs(size, num_words, seed)
+        for class_name, benchmark in [('TRArticles', benchmark_tr_articles), 
+                                      ('Articles', benchmark_articles)]:
+            for result in benchmark(size, num_words, repeat, seed):
+                results['benchmarks'].append(dict(result, **{'class': class_name, 'size': size}))
+    
+    if output is not None:
+        with open(output, 'w') as fp:
+            json.dump(results, fp, indent=2)
+    
+    return results
+
+def benchmark_normalizer(num_texts=200, num_words=500, repeat=5, seed=0):
+    """
+    Time the precompiled normalizer against the previous chain on generated
+    article bodies.  Returns a dict of the best time (s) of each and the speedup.
+    """
+    texts = [generate_text(num_words, seed+i) for i in range(num_texts)]
+
+    for text in texts:
+        if normalize_text(text) != _normalize_chain(text):
+            raise ValueError('Normalizer output differs from the chain.')
+
+    chain_time = min(timeit.repeat(lambda: [_normalize_chain(text) for text in texts],
+                                   number=1, repeat=repeat))
+    normalizer_time = min(timeit.repeat(lambda: [normalize_text(text) for text in texts],
+                                        number=1, repeat=repeat))
+
+    return {'num_texts': num_texts, 'num_words': num_words,
+            'chain_time': chain_time, 'normalizer_time': normalizer_time,
+            'speedup': chain_time / normalizer_time}
+
+
+if __name__ == '__main__':
+    #   python benchmarks.py [size ...]
+    sizes = [int(size) for size in sys.argv[1:]] or [1000, 10000]
+    
+    print(benchmark_normalizer())
+    for result in run_benchmarks(sizes)['benchmarks']:
+        print(result['class'], result['method'], result['size'], 
+              round(result['time'], 4), "s", result['peak_memory'] // 1024, "KiB")
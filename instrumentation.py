@@ -0,0 +1,195 @@
+"""
+Per-call metrics of the Articles and TRArticles pipelines.
+
+Name:   Arnold YS Yeung
+Date:   2026-10-17
+"""
+
+import sys
+import time
+import json
+import inspect
+import functools
+import tracemalloc
+
+try:
+    import resource
+except ImportError:         #   not available on Windows
+    resource = None
+
+
+def _get_max_rss():
+    """
+    Get the peak resident set size of the process in bytes (None if unknown).
+    """
+    if resource is None:
+        return None
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    #   kilobytes on Linux, bytes on macOS
+    if sys.platform == 'darwin':
+        return max_rss
+    return max_rss * 1024
+
+
+class PipelineMetrics:
+    """
+    Collects a record of each instrumented call of the objects it is passed to
+    (e.g., Articles(dataframe, metrics=metrics)).  Each record has:
+        - class, method:    name of the class and method
+        - depth:            number of instrumented calls it is nested in (e.g.,
+                            build_term_matrix() called by compute_trend())
+        - wall_time:        wall time of the call (s)
+        - rows_in, rows_out: number of rows of the dataframe before and after the
+                            call (or of the returned dataframe)
+        - tokens:           number of tokens in the columns of the call after the call
+                            (None if the columns are not tokenized)
+        - max_rss:          peak resident set size of the process after the call (bytes)
+        - peak_memory:      peak memory allocated during the call (bytes, only if
+                            trace_memory, with tracemalloc)
+        - error:            name of the exception raised by the call (None otherwise)
+    Callbacks (e.g., for exporting to a monitoring system) are called with each
+    record as it is added.
+    """
+
+    def __init__(self, callbacks=[], trace_memory=False, keep_records=True):
+
+        self.callbacks = list(callbacks)
+        self.trace_memory = trace_memory
+        self.keep_records = keep_records
+        self.records = []
+        self.depth = 0
+        self.memory_floor = 0
+
+    def add_callback(self, callback):
+        """
+        Add a function called with each new record.
+        """
+        self.callbacks.append(callback)
+
+    def add_record(self, record):
+        """
+        Add a record and pass it to the callbacks.
+        """
+        if self.keep_records:
+            self.records.append(record)
+        for callback in self.callbacks:
+            callback(record)
+
+    def reset(self):
+        """
+        Remove all records.
+        """
+        self.records = []
+
+    def summary(self):
+        """
+        Get the number of calls and total wall time, rows, tokens and the largest peak
+        memory of each class and method (of top-level calls only).
+        """
+        summary = {}
+        for record in self.records:
+            if record['depth'] > 0:
+                continue
+
+            key = record['class'] + '.' + record['method']
+            if key not in summary:
+                summary[key] = {'calls': 0, 'wall_time': 0., 'rows_in': 0, 'rows_out': 0,
+                                'tokens': 0, 'peak_memory': None}
+            method_summary = summary[key]
+            method_summary['calls'] += 1
+            method_summary['wall_time'] += record['wall_time']
+            method_summary['rows_in'] += record['rows_in'] or 0
+            method_summary['rows_out'] += record['rows_out'] or 0
+            method_summary['tokens'] += record['tokens'] or 0
+            if record['peak_memory'] is not None:
+                method_summary['peak_memory'] = max(method_summary['peak_memory'] or 0,
+                                                    record['peak_memory'])
+        return summary
+
+    def save(self, file):
+        """
+        Save the records to a .json file.
+        """
+        with open(file, 'w') as fp:
+            json.dump(self.records, fp, indent=2)
+
+
+def _get_rows(obj):
+    #   _dataframe does not load cached columns of Articles (see Articles.dataframe)
+    dataframe = getattr(obj, '_dataframe', None)
+    if dataframe is None:
+        dataframe = getattr(obj, 'dataframe', None)
+    if dataframe is None:
+        return None
+    return dataframe.shape[0]
+
+def instrument(method):
+    """
+    Decorator recording the metrics of each call of method into the metrics
+    (PipelineMetrics) of its object.  Calls of objects without metrics are run as
+    is.  Tokens are counted with the _count_tokens(columns) method of the object (if
+    any) for the columns argument of method.
+    """
+    signature = inspect.signature(method)
+    has_columns = 'columns' in signature.parameters
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+
+        metrics = getattr(self, 'metrics', None)
+        if metrics is None:
+            return method(self, *args, **kwargs)
+
+        record = {'class': type(self).__name__, 'method': method.__name__,
+                  'depth': metrics.depth, 'wall_time': None, 'rows_in': _get_rows(self),
+                  'rows_out': None, 'tokens': None, 'max_rss': None, 'peak_memory': None,
+                  'error': None}
+
+        #   tracemalloc is only started by the outermost traced call, and nested calls
+        #   keep the peak before their reset_peak() for the calls they are nested in
+        start_trace = metrics.trace_memory and not tracemalloc.is_tracing()
+        if start_trace:
+            tracemalloc.start()
+            metrics.memory_floor = 0
+        elif metrics.trace_memory:
+            metrics.memory_floor = max(metrics.memory_floor, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+
+        metrics.depth += 1
+        start = time.perf_counter()
+        try:
+            result = method(self, *args, **kwargs)
+        except BaseException as error:
+            record['error'] = type(error).__name__
+            raise
+        finally:
+            record['wall_time'] = time.perf_counter() - start
+            metrics.depth -= 1
+
+            if metrics.trace_memory:
+                peak_memory = tracemalloc.get_traced_memory()[1]
+                record['peak_memory'] = peak_memory
+                if start_trace:
+                    record['peak_memory'] = max(peak_memory, metrics.memory_floor)
+                    tracemalloc.stop()
+            record['max_rss'] = _get_max_rss()
+
+            if record['error'] is None:
+                #   methods returning a new dataframe (e.g., reformat(keep=False))
+                if getattr(result, 'columns', None) is not None and hasattr(result, 'shape'):
+                    record['rows_out'] = result.shape[0]
+                else:
+                    record['rows_out'] = _get_rows(self)
+
+                count_tokens = getattr(self, '_count_tokens', None)
+                if has_columns and count_tokens is not None:
+                    columns = signature.bind(self, *args, **kwargs).arguments.get('columns')
+                    if columns is not None:
+                        record['tokens'] = count_tokens(columns)
+
+            metrics.add_record(record)
+
+        return result
+
+    return wrapper
@@ -0,0 +1,118 @@
+"""
+Non-interactive (headless) rendering of trend charts for batch reports.
+
+Name:   Arnold YS Yeung
+Date:   2026-10-17
+"""
+
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+
+def get_chart(trending_words, method='count', n=10, top=True, min_date=None, max_date=None,
+              file=None):
+    """
+    Get the chart (dict) of trending words (list of (token, score)) as plotted by
+    Articles.plot_trends().  The chart is written to file if not None.
+    """
+    if top:
+        title = 'Top '+str(n)+' trending words ('+str(min_date)+' to '+str(max_date)+')'
+    else:
+        title = 'Bottom '+str(n)+' trending words ('+str(min_date)+' to '+str(max_date)+')'
+
+    return {'tokens': [str(pair[0]) for pair in trending_words],
+            'scores': [float(pair[1]) for pair in trending_words],
+            'title': title,
+            'ylabel': method+' score',
+            'file': file}
+
+
+class ChartRenderer:
+    """
+    Renders bar charts of trending words on a single reusable figure and axes,
+    without pyplot (no global state, no window and no leaked figures).  The margins
+    are fixed (instead of bbox_inches="tight"), so each chart is drawn only once.
+    """
+
+    def __init__(self, dpi=100, format='png', figsize=(6.4, 4.8)):
+
+        self.dpi = dpi
+        self.format = format
+        self.figure = Figure(figsize=figsize)
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.figure.subplots_adjust(bottom=0.25)
+        self.axes = self.figure.add_subplot()
+
+    def render(self, chart):
+        """
+        Render chart (see get_chart()).  Returns the image as bytes, or writes it to
+        chart['file'] (if not None) and returns None.
+        """
+        axes = self.axes
+        axes.cla()
+
+        #   numeric positions, as categorical axes would keep the tokens of all charts
+        positions = range(len(chart['tokens']))
+        axes.bar(positions, chart['scores'])
+        axes.set_xticks(positions, chart['tokens'], rotation=45, ha='right')
+        axes.set_title(chart['title'])
+        axes.set_xlabel('words')
+        axes.set_ylabel(chart['ylabel'])
+
+        file = chart.get('file')
+        if file is not None:
+            self.figure.savefig(file, format=self.format, dpi=self.dpi)
+            return None
+
+        buffer = io.BytesIO()
+        self.figure.savefig(buffer, format=self.format, dpi=self.dpi)
+        return buffer.getvalue()
+
+#   renderer of each rendering worker process (set once by the pool initializer)
+_worker_renderer = None
+
+def init_render_worker(dpi=100, format='png', figsize=(6.4, 4.8)):
+    """
+    Initialize a rendering worker process with its reusable renderer.
+    """
+    global _worker_renderer
+    _worker_renderer = ChartRenderer(dpi, format, figsize)
+
+def render_chunk(charts):
+    """
+    Render a chunk of charts with the renderer of the worker process.
+    """
+    return [_worker_renderer.render(chart) for chart in charts]
+
+def render_charts(charts, dpi=100, format='png', figsize=(6.4, 4.8), workers=1, chunk_size=10):
+    """
+    Render many charts (see get_chart()), each on the reusable figure of one worker
+    process.  Returns the image (bytes) of each chart, or None for charts written to
+    their file.
+    INPUT:
+        - charts (List[dict]):      charts from get_chart()
+        - dpi (int):                resolution of the images
+        - format (str):             format of the images (e.g., 'png', 'svg')
+        - figsize (tuple):          size of the figures (inches)
+        - workers (int):            number of worker processes (if None, number of CPUs)
+        - chunk_size (int):         number of charts sent to a worker at a time
+    """
+    if workers is None:
+        workers = os.cpu_count()
+
+    if workers == 1:
+        renderer = ChartRenderer(dpi, format, figsize)
+        return [renderer.render(chart) for chart in charts]
+
+    chunks = [charts[i:i+chunk_size] for i in range(0, len(charts), chunk_size)]
+
+    images = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_render_worker,
+                             initargs=(dpi, format, figsize)) as executor:
+        for chunk_images in executor.map(render_chunk, chunks):
+            images.extend(chunk_images)
+    return images
@@ -0,0 +1,198 @@
+"""
+Binary, memory-mapped store of trend scores.
+
+Name:   Arnold YS Yeung
+Date:   2026-10-17
+
+A store file holds the count, text and norm scores, the date range and the tokens
+of one set of trend scores:
+    - 8 bytes:      magic
+    - 8 bytes:      length of the header (little-endian uint64)
+    - header:       JSON of the date range and the offset, dtype and length of each array
+    - arrays:       (8-byte aligned)
+        - scores:           float64 [3, num_tokens] (NaN if the token has no score)
+        - token_offsets:    int64 [num_tokens+1] of the tokens in token_data
+        - token_data:       UTF-8 bytes of the tokens, sorted
+        - rank_<method>:    int32 token indices sorted descendingly by score (ties in the
+                            insertion order of the scores, as Articles.rank_tokens())
+"""
+
+import json
+import numpy as np
+
+
+MAGIC = b'WTSCORE1'
+METHODS = ('count', 'text', 'norm')
+
+
+def save_score_store(file, count_score, text_score, norm_score, min_date=None, max_date=None):
+    """
+    Save the trend scores (dicts of token to score) of the 3 methods into a store file.
+    """
+
+    scores_by_method = (count_score, text_score, norm_score)
+
+    tokens = set()
+    for scores in scores_by_method:
+        tokens.update(scores)
+    tokens = sorted(tokens)
+
+    scores = np.full((len(METHODS), len(tokens)), np.nan)
+    for i, method_scores in enumerate(scores_by_method):
+        scores[i] = [method_scores.get(token, np.nan) for token in tokens]
+
+    #   methods with integer scores (e.g., unweighted count) are read back as int
+    integer_methods = [method for method, method_scores in zip(METHODS, scores_by_method)
+                       if all(isinstance(score, (int, np.integer)) for score in method_scores.values())]
+
+    encoded_tokens = [token.encode('utf-8') for token in tokens]
+    token_offsets = np.zeros(len(tokens)+1, dtype=np.int64)
+    np.cumsum([len(token) for token in encoded_tokens], out=token_offsets[1:])
+
+    arrays = {'scores': scores,
+              'token_offsets': token_offsets,
+              'token_data': np.frombuffer(b''.join(encoded_tokens), dtype=np.uint8)}
+    token_indices = {token: i for i, token in enumerate(tokens)}
+    for method, method_scores in zip(METHODS, scores_by_method):
+        #   same order as the in-memory ranking (tokens without a score are left out)
+        rank = sorted(method_scores, key=method_scores.get, reverse=True)
+        arrays['rank_'+method] = np.array([token_indices[token] for token in rank], dtype=np.int32)
+
+    #   offsets of the arrays (relative to the end of the header)
+    layout = {}
+    offset = 0
+    for name, values in arrays.items():
+        layout[name] = [offset, values.dtype.str, int(values.size)]
+        offset += _align(values.nbytes)
+
+    header = json.dumps({'min_date': _to_json(min_date), 'max_date': _to_json(max_date),
+                         'num_tokens': len(tokens), 'integer_methods': integer_methods,
+                         'arrays': layout}).encode('utf-8')
+    header += b' ' * (_align(len(header)) - len(header))
+
+    with open(file, 'wb') as fp:
+        fp.write(MAGIC)
+        fp.write(np.uint64(len(header)).tobytes())
+        fp.write(header)
+        for values in arrays.values():
+            data = np.ascontiguousarray(values).tobytes()
+            fp.write(data)
+            fp.write(b'\0' * (_align(len(data)) - len(data)))
+
+def _align(num_bytes):
+    return (num_bytes + 7) // 8 * 8
+
+def _to_json(value):
+    return None if value is None else str(value)
+
+
+class ScoreStore:
+    """
+    Read-only view of a store file.  The file is memory-mapped, so looking up the
+    scores of single tokens or the top (or bottom) n tokens only reads the pages
+    needed.
+    """
+
+    def __init__(self, file):
+
+        self.file = file
+        self.buffer = np.memmap(file, dtype=np.uint8, mode='r')
+
+        if self.buffer[:len(MAGIC)].tobytes() != MAGIC:
+            raise ValueError('Invalid score store file.')
+
+        header_length = int(self.buffer[8:16].view('<u8')[0])
+        header = json.loads(self.buffer[16:16+header_length].tobytes().decode('utf-8'))
+
+        self.min_date = header['min_date']
+        self.max_date = header['max_date']
+        self.num_tokens = header['num_tokens']
+        self.integer_methods = header['integer_methods']
+
+        start = 16 + header_length
+        self.arrays = {}
+        for name, (offset, dtype, length) in header['arrays'].items():
+            self.arrays[name] = np.frombuffer(self.buffer, dtype=np.dtype(dtype), count=length,
+                                              offset=start+offset)
+        self.arrays['scores'] = self.arrays['scores'].reshape(len(METHODS), self.num_tokens)
+
+    def __len__(self):
+        return self.num_tokens
+
+    def get_token(self, index):
+        """
+        Get the token at index (of the sorted tokens).
+        """
+        offsets = self.arrays['token_offsets']
+        return self.arrays['token_data'][offsets[index]:offsets[index+1]].tobytes().decode('utf-8')
+
+    def find(self, token):
+        """
+        Get the index of token (binary search over the sorted tokens), or -1.
+        """
+        low = 0
+        high = self.num_tokens
+        while low < high:
+            middle = (low + high) // 2
+            if self.get_token(middle) < token:
+                low = middle + 1
+            else:
+                high = middle
+
+        if low < self.num_tokens and self.get_token(low) == token:
+            return low
+        return -1
+
+    def get_score(self, token, method='count'):
+        """
+        Get the score of token using the specified method (None if it has no score).
+        """
+        if method not in METHODS:
+            raise ValueError("Invalid method.")
+
+        index = self.find(token)
+        if index == -1:
+            return None
+
+        score = self.arrays['scores'][METHODS.index(method), index]
+        if np.isnan(score):
+            return None
+        return self._convert(method, score)
+
+    def get_trending_words(self, method='count', n=10, top=True):
+        """
+        Get the top (or bottom) n trending words (and scores) using the specified method,
+        sliced as the in-memory ranking (e.g., the bottom 0 are all tokens).
+        """
+        if method not in METHODS:
+            raise ValueError("Invalid method.")
+
+        rank = self.arrays['rank_'+method]
+        if top:
+            indices = rank[:n]
+        else:
+            indices = rank[-n:]
+
+        scores = self.arrays['scores'][METHODS.index(method)]
+        return [(self.get_token(index), self._convert(method, scores[index])) 
+                for index in indices.tolist()]
+
+    def get_scores(self, method='count'):
+        """
+        Get the scores of all tokens using the specified method as a dict.
+        """
+        if method not in METHODS:
+            raise ValueError("Invalid method.")
+
+        offsets = self.arrays['token_offsets'].tolist()
+        data = self.arrays['token_data'].tobytes()
+        scores = self.arrays['scores'][METHODS.index(method)]
+
+        #   in descending order of scores
+        return {data[offsets[index]:offsets[index+1]].decode('utf-8'): self._convert(method, scores[index])
+                for index in self.arrays['rank_'+method].tolist()}
+
+    def _convert(self, method, score):
+        if method in self.integer_methods:
+            return int(score)
+        return float(score)
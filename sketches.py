@@ -0,0 +1,259 @@
+"""
+Approximate streaming trend scores with bounded memory (count-min sketches and
+heavy hitters).
+
+Name:   Arnold YS Yeung
+Date:   2026-10-17
+"""
+
+import math
+import heapq
+import hashlib
+from functools import lru_cache
+from collections import Counter
+
+import numpy as np
+
+from utils import preprocess_text, StopWordFilter
+
+
+class CountMinSketch:
+    """
+    Count-min sketch of the (non-negative, possibly fractional) scores of tokens in
+    a fixed depth x width table.  An estimate is never below the true score, and
+    with probability 1 - delta it is at most epsilon * (total of all scores) above
+    it, where width = ceil(e / epsilon) and depth = ceil(ln(1 / delta)).
+    """
+
+    def __init__(self, epsilon=0.001, delta=0.01, width=None, depth=None, seed=0,
+                 cache_size=65536):
+
+        if width is None:
+            width = int(math.ceil(math.e / epsilon))
+        if depth is None:
+            depth = int(math.ceil(math.log(1. / delta)))
+
+        self.width = width
+        self.depth = depth
+        self.seed = seed
+        self.table = np.zeros((depth, width))
+        self.total = 0.
+
+        #   bounded cache of the column of each token in each row
+        self._get_columns = lru_cache(maxsize=cache_size)(self._compute_columns)
+
+    def _compute_columns(self, token):
+        """
+        Get the column of token in each row (from keyed BLAKE2b hashes).
+        """
+        data = token.encode('utf-8')
+        digests = b''
+        for block in range(0, self.depth, 8):
+            digests += hashlib.blake2b(data, digest_size=8*min(8, self.depth-block),
+                                       key=str(self.seed).encode('utf-8'),
+                                       salt=block.to_bytes(16, 'little')).digest()
+        return np.frombuffer(digests, dtype=np.uint64) % np.uint64(self.width)
+
+    def get_columns(self, tokens):
+        """
+        Get the columns of tokens in each row as a depth x len(tokens) array.
+        """
+        if len(tokens) == 0:
+            return np.zeros((self.depth, 0), dtype=np.int64)
+        return np.stack([self._get_columns(token) for token in tokens], axis=1).astype(np.int64)
+
+    def add(self, tokens, scores, columns=None):
+        """
+        Add scores (array-like) of tokens.  Returns the estimates of tokens after adding.
+        """
+        if columns is None:
+            columns = self.get_columns(tokens)
+        scores = np.asarray(scores, dtype=np.float64)
+
+        rows = np.arange(self.depth)[:, None]
+        np.add.at(self.table, (np.broadcast_to(rows, columns.shape), columns),
+                  np.broadcast_to(scores, columns.shape))
+        self.total += float(scores.sum())
+
+        return self.table[rows, columns].min(axis=0)
+
+    def estimate(self, token):
+        """
+        Estimate the score of token.
+        """
+        return float(self.table[np.arange(self.depth), self._get_columns(token).astype(np.int64)].min())
+
+    def merge(self, other):
+        """
+        Add the scores of other (a sketch of the same width, depth and seed).
+        """
+        if (self.width, self.depth, self.seed) != (other.width, other.depth, other.seed):
+            raise ValueError('Mismatched sketches.')
+
+        self.table += other.table
+        self.total += other.total
+
+
+class HeavyHitters:
+    """
+    The (at most) capacity tokens with the largest estimated scores, kept in a
+    min-heap with lazy deletion of outdated entries.
+    """
+
+    def __init__(self, capacity=100):
+
+        self.capacity = capacity
+        self.scores = {}
+        self.heap = []
+
+    def update(self, token, score):
+        """
+        Update the estimated score of token, which replaces the token with the smallest
+        score if the heap is full and score is larger.
+        """
+        if token in self.scores:
+            self.scores[token] = score
+            heapq.heappush(self.heap, (score, token))
+        elif len(self.scores) < self.capacity:
+            self.scores[token] = score
+            heapq.heappush(self.heap, (score, token))
+        else:
+            min_score, min_token = self._peek_min()
+            if score <= min_score:
+                return
+            heapq.heappop(self.heap)
+            del self.scores[min_token]
+            self.scores[token] = score
+            heapq.heappush(self.heap, (score, token))
+
+        #   drop outdated entries when the heap grows too large
+        if len(self.heap) > 4 * self.capacity:
+            self.heap = [(score, token) for token, score in self.scores.items()]
+            heapq.heapify(self.heap)
+
+    def _peek_min(self):
+        while self.heap[0][0] != self.scores.get(self.heap[0][1]):
+            heapq.heappop(self.heap)
+        return self.heap[0]
+
+    def get_top(self, n=10):
+        """
+        Get the n tokens with the largest scores (and scores) in descending order.
+        """
+        return heapq.nlargest(n, self.scores.items(), key=lambda item: item[1])
+
+
+class StreamingTrendScorer:
+    """
+    Approximate count, text and norm trend scores (see Articles.compute_trend()) of
+    articles fed one at a time, in fixed memory: one count-min sketch and one heavy
+    hitters heap per method.  Only the top trending words can be queried (bottom
+    words are not tracked).
+    INPUT:
+        - columns (List[str]):              name of columns
+        - column_weights(List[float]):      weights of columns (if empty, balanced)
+        - stop_words (List[str]):           stop words to remove from raw (str) texts
+        - capacity (int):                   number of top tokens tracked for each method
+        - epsilon, delta (float):           error bounds of the sketches (see CountMinSketch)
+    """
+
+    methods = ('count', 'text', 'norm')
+
+    def __init__(self, columns, column_weights=[], stop_words=None, capacity=100,
+                 epsilon=0.001, delta=0.01, seed=0):
+
+        if len(column_weights) != 0 and len(column_weights) != len(columns):
+            raise ValueError('Mismatched column weights.')
+
+        #   normalize column weights (from 0 to 1)
+        if len(column_weights) != 0:
+            sum_weights = sum(column_weights)
+            column_weights = [float(weight) / sum_weights for weight in column_weights]
+
+        if stop_words is not None and not isinstance(stop_words, StopWordFilter):
+            stop_words = StopWordFilter(stop_words)
+
+        self.columns = list(columns)
+        self.column_weights = column_weights
+        self.stop_words = stop_words
+        self.sketches = {method: CountMinSketch(epsilon, delta, seed=seed) for method in self.methods}
+        self.heavy_hitters = {method: HeavyHitters(capacity) for method in self.methods}
+        self.num_articles = 0
+        self.min_date = None
+        self.max_date = None
+
+    def add_article(self, article):
+        """
+        Add an article (dict or row of a dataframe) whose columns are lists of tokens
+        or raw texts (pre-processed with utils.preprocess_text() and the stop words).
+        """
+        for i, column in enumerate(self.columns):
+            tokens = article[column]
+            if isinstance(tokens, str):
+                tokens = preprocess_text(tokens, self.stop_words)
+            if len(tokens) == 0:
+                continue
+
+            if i < len(self.column_weights):
+                weight = self.column_weights[i]
+            else:
+                weight = 1
+
+            counts = Counter(tokens)
+            unique_tokens = list(counts)
+            token_counts = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+            scores = {'count': token_counts * weight,
+                      'text': np.full(len(unique_tokens), float(weight)),
+                      'norm': token_counts / len(tokens) * weight}
+
+            #   all sketches share the seed (and so the columns of each token)
+            columns = self.sketches['count'].get_columns(unique_tokens)
+            for method in self.methods:
+                estimates = self.sketches[method].add(unique_tokens, scores[method], columns)
+                heavy_hitters = self.heavy_hitters[method]
+                for token, estimate in zip(unique_tokens, estimates.tolist()):
+                    heavy_hitters.update(token, estimate)
+
+        date = article.get('DATE') if hasattr(article, 'get') else None
+        if date is not None:
+            if self.min_date is None or date < self.min_date:
+                self.min_date = date
+            if self.max_date is None or date > self.max_date:
+                self.max_date = date
+
+        self.num_articles += 1
+        return
+
+    def add_dataframe(self, dataframe):
+        """
+        Add the articles (rows) of a dataframe one at a time.
+        """
+        for column in self.columns:
+            if column not in dataframe.columns:
+                raise ValueError('Cannot find ', column, 'column.')
+
+        for article in dataframe.to_dict('records'):
+            self.add_article(article)
+        return
+
+    def get_trend_score(self, token, method='count'):
+        """
+        Estimate the trend score of token using the specified method (never below the
+        exact score).
+        """
+        if method not in self.methods:
+            raise ValueError("Invalid method.")
+
+        return self.sketches[method].estimate(token)
+
+    def get_trending_words(self, method='count', n=10, top=True):
+        """
+        Get the (approximate) top n trending words (and scores) using the specified
+        method, as Articles.get_trending_words().  n is at most the capacity.
+        """
+        if method not in self.methods:
+            raise ValueError("Invalid method.")
+        if not top:
+            raise ValueError("Bottom trending words are not supported.")
+
+        return self.heavy_hitters[method].get_top(n)
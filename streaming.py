@@ -0,0 +1,145 @@
+"""
+Streaming computation of trend scores from a raw Thomson Reuters .csv file.
+
+Name:   Arnold YS Yeung
+Date:   2026-10-17
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from tr_preprocessing import TRArticles
+from articles import Articles
+from utils import StopWordFilter, init_preprocess_worker
+
+
+def _iter_story_chunks(file, identifier, fill_columns, languages, chunksize, carry_chunks):
+    """
+    Read a raw TR .csv file in chunks, such that the takes of a story which fall
+    into consecutive chunks are in the same yielded chunk.  Rows of a story whose
+    fill_columns are still missing (in all its rows of the languages) are carried
+    into the next chunk, for at most carry_chunks chunks.  Later rows of a story
+    yielded in the last carry_chunks chunks are dropped (as duplicates).
+    """
+    pending = None
+    first_seen = {}         #   chunk of the first row of each carried story ID
+    yielded = {}            #   chunk in which each recently yielded story ID was yielded
+    
+    for i, chunk in enumerate(pd.read_csv(file, chunksize=chunksize)):
+        
+        if identifier is None:
+            yield chunk
+            continue
+        
+        for column in [identifier, 'LANGUAGE']:
+            if column not in chunk.columns:
+                raise ValueError('Cannot find ', column, ' column.')
+        
+        if pending is not None and pending.shape[0] > 0:
+            chunk = pd.concat([pending, chunk])
+        chunk = chunk.loc[~chunk[identifier].isin(yielded.keys())]
+        
+        ids = chunk[identifier]
+        in_languages = chunk['LANGUAGE'].isin(languages)
+        
+        #   story IDs with a missing value in all rows of a fill_column
+        is_filled = chunk.loc[in_languages, fill_columns].notna().groupby(
+            ids[in_languages].to_numpy(), sort=False).any().all(axis=1)
+        carry_ids = [story_id for story_id in is_filled.index[~is_filled.to_numpy()]
+                     if i - first_seen.setdefault(story_id, i) < carry_chunks]
+        first_seen = {story_id: first_seen[story_id] for story_id in carry_ids}
+        
+        carry_mask = ids.isin(carry_ids)
+        pending = chunk.loc[carry_mask]
+        chunk = chunk.loc[~carry_mask]
+        
+        #   only rows of the languages are kept by TRArticles.reformat()
+        for story_id in chunk.loc[in_languages[~carry_mask], identifier].dropna().unique():
+            yielded[story_id] = i
+        yielded = {story_id: j for story_id, j in yielded.items() if i - j < carry_chunks}
+        
+        yield chunk
+    
+    if pending is not None and pending.shape[0] > 0:
+        yield pending
+    return
+
+def stream_trend_scores(file, spec, columns, column_weights=[], date_range=[], 
+                        stop_words=None, languages=['EN'], chunksize=100000, workers=1,
+                        carry_chunks=2, verbose=False):
+    """
+    Compute trend scores of a raw TR .csv file by reading, reformatting (with
+    TRArticles.reformat(spec)) and pre-processing (with Articles.preprocess()) one
+    chunk at a time.  Only the current chunk, the rows carried over from the last
+    carry_chunks chunks and the trend scores are kept in memory.  Returns an 
+    Articles object with the trend scores and an empty dataframe.
+    INPUT:
+        - file (str):                       raw TR .csv file
+        - spec (dict):                      reformatting spec (see TRArticles.reformat())
+        - columns (List[str]):              name of columns
+        - column_weights(List[float]):      weights of columns (if empty, balanced)
+        - date_range(list[str]):            min and max date inclusively (if empty, all dates)
+        - stop_words (List[str]):           stop words to remove
+        - languages (List[str]):            languages to keep
+        - chunksize (int):                  number of raw rows read at a time
+        - workers (int):                    number of pre-processing worker processes
+        - carry_chunks (int):               number of chunks the rows of a story are 
+                                            carried over while its fill_columns are missing
+
+    The rows of a story whose fill_columns are still missing are carried into the
+    next chunk (for at most carry_chunks chunks), so takes of a story within 
+    carry_chunks + 1 consecutive chunks are joined as in TRArticles.reformat() of 
+    the whole file.  Rows of a story scored in the last carry_chunks chunks are 
+    dropped, and later rows of older stories are scored as new stories.
+    """
+
+    if carry_chunks < 1:
+        raise ValueError("Invalid carry_chunks.")
+
+    identifier = spec.get('identifier')
+    fill_columns = spec.get('fill_columns', [])
+    articles = None
+
+    if stop_words is not None and not isinstance(stop_words, StopWordFilter):
+        stop_words = StopWordFilter(stop_words)
+
+    #   one process pool pre-processes all chunks (instead of one pool per chunk)
+    executor = None
+    if workers is None or workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=init_preprocess_worker,
+                                       initargs=(stop_words,))
+
+    try:
+        for i, chunk in enumerate(_iter_story_chunks(file, identifier, fill_columns, languages,
+                                                     chunksize, carry_chunks)):
+
+            if verbose:
+                print("Processing chunk ", i, "...")
+
+            dataframe = TRArticles(chunk, languages).reformat(spec)
+            del chunk
+
+            if dataframe.shape[0] == 0:
+                continue
+
+            if articles is None:
+                articles = Articles(dataframe, stop_words=stop_words, date_range=date_range)
+                min_date = articles.min_date
+                max_date = articles.max_date
+            else:
+                articles.dataframe = dataframe
+                #   scores include every date if date_range is not set
+                if date_range == []:
+                    min_date = min(min_date, dataframe['DATE'].min())
+                    max_date = max(max_date, dataframe['DATE'].max())
+
+            articles.preprocess(columns, executor=executor)
+            articles.compute_trend(columns, list(column_weights), [min_date, max_date], 
+                                   reset=False)
+            articles.dataframe = articles.dataframe.iloc[0:0]
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    return articles
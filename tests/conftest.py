@@ -0,0 +1,93 @@
+"""
+Shared fixtures of the tests.
+
+Name:   Arnold YS Yeung
+Date:   2026-10-17
+"""
+
+import os
+import sys
+import random
+
+import pandas as pd
+import pytest
+
+#   modules are imported from the root of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORDS = ['said', 'percent', 'market', 'bank', 'oil', 'price', 'trade', 'china', '&amp;', 
+         'rates', 'fed', 'stock', '2013', 'q1', 'euro', 'deal', 'growth', 'tax', 'jobs', 'vote']
+
+STOP_WORDS = ['said', 'the', 'percent']
+
+
+def generate_text(rng, num_words):
+    """
+    Generate a noisy text of num_words words (with URLs, entities, newlines and tabs).
+    """
+    words = [rng.choice(WORDS) for _ in range(num_words)]
+    if rng.random() < 0.3:
+        words.insert(rng.randrange(len(words)+1), 'http://x.com/a,b')
+    if rng.random() < 0.3:
+        words.insert(rng.randrange(len(words)+1), 'www.reuters.com')
+    return ' '.join(words).replace('bank', 'bank\n').replace('oil', 'oil\t,')
+
+def generate_articles(num_articles, seed=0, days=30):
+    """
+    Generate an 'Article'-format dataframe of num_articles articles in June 2013.
+    """
+    rng = random.Random(seed)
+    rows = []
+    for i in range(num_articles):
+        rows.append({'DATE': '2013-06-%02d' % rng.randint(1, days), 'TIME': '10:00',
+                     'TITLE': generate_text(rng, 6), 'ID': 'id'+str(seed)+'_'+str(i),
+                     'TEXT': generate_text(rng, rng.randint(0, 40)), 'PLATFORMS': {'A'},
+                     'TOPICS': {'B'}, 'LANGUAGE': 'EN'})
+    return pd.DataFrame(rows)
+
+def generate_tr_articles(num_stories, seed=0):
+    """
+    Generate a raw TR dataframe of num_stories stories of 1 to 3 takes each (about 
+    10% in German and 5% internal calls).
+    """
+    rng = random.Random(seed)
+    rows = []
+    for i in range(num_stories):
+        date = '2013-06-%02d' % (i * 30 // num_stories + 1)
+        language = 'EN' if rng.random() < 0.9 else 'DE'
+        headline = rng.choice(['TEST foo', 'SERVICE ALERT x']) if rng.random() < 0.05 \
+            else generate_text(rng, 5)
+        for take in range(rng.randint(1, 3)):
+            rows.append({'DATE': date, 'TIME': '10:00', 'UNIQUE_STORY_INDEX': 's'+str(i),
+                         'HEADLINE_ALERT_TEXT': headline if take == 0 or rng.random() < 0.5 else None,
+                         'ACCUMULATED_STORY_TEXT': generate_text(rng, 20) if take > 0 else None,
+                         'TAKE_TEXT': generate_text(rng, 10) if rng.random() < 0.7 else None,
+                         'PRODUCTS': rng.choice(['A B', 'XX C', 'A']), 'TOPICS': 'T1 T2',
+                         'LANGUAGE': language, 'EVENT_TYPE': 'STORY_TAKE_OVERWRITE', 'PNAC': 'x'})
+    return pd.DataFrame(rows)
+
+TR_SPEC = {'identifier': 'UNIQUE_STORY_INDEX',
+           'fill_columns': ['HEADLINE_ALERT_TEXT', 'ACCUMULATED_STORY_TEXT', 'TAKE_TEXT'],
+           'internal_calls': {'HEADLINE_ALERT_TEXT': ['Test, Please Ignore', 'SERVICE ALERT',
+                                                      'THIS IS A TEST MESSAGE'],
+                              'PRODUCTS': ['XX', 'TEST']},
+           'set_columns': ['PRODUCTS', 'TOPICS'],
+           'concatenate_columns': ['ACCUMULATED_STORY_TEXT', 'TAKE_TEXT'],
+           'rename': {'UNIQUE_STORY_INDEX': 'ID', 'HEADLINE_ALERT_TEXT': 'TITLE', 
+                      'ACCUMULATED_STORY_TEXT': 'TEXT', 'PRODUCTS': 'PLATFORMS'},
+           'drop_columns': ['EVENT_TYPE', 'PNAC']}
+
+def assert_same_scores(articles, expected, methods=['count', 'text', 'norm']):
+    """
+    Assert that the (non-zero) trend scores of articles are those of expected.
+    """
+    for method in methods:
+        scores = getattr(articles, 'trend_'+method+'_score')
+        expected_scores = getattr(expected, 'trend_'+method+'_score')
+        assert {token: score for token, score in scores.items() if score != 0} == \
+            pytest.approx({token: score for token, score in expected_scores.items() if score != 0})
+
+
+@pytest.fixture
+def dataframe():
+    return generate_articles(50)
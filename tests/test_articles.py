@@ -0,0 +1,375 @@
+"""
+Tests of Articles.
+
+Name:   Arnold YS Yeung
+Date:   2026-10-17
+"""
+
+import pandas as pd
+import pytest
+
+from articles import Articles
+from utils import StopWordFilter
+
+from conftest import generate_articles, assert_same_scores, STOP_WORDS
+
+COLUMNS = ['TITLE', 'TEXT']
+
+
+def run_cached_stages(articles):
+    articles.remove_noise(COLUMNS)
+    articles.replace_punctuations(COLUMNS)
+    articles.tokenize(COLUMNS)
+    articles.remove_stop_words(COLUMNS)
+
+
+def test_cache_after_dataframe_is_replaced(dataframe, tmp_path):
+    """
+    Stages after replacing the dataframe are not matched with the cache of the 
+    previous dataframe.
+    """
+    other = generate_articles(30, seed=1)
+    run_cached_stages(Articles(dataframe.copy(), stop_words=STOP_WORDS, cache_dir=str(tmp_path)))
+    
+    articles = Articles(dataframe.copy(), stop_words=STOP_WORDS, cache_dir=str(tmp_path))
+    articles.remove_noise(COLUMNS)
+    articles.dataframe = other.copy()
+    articles.replace_punctuations(COLUMNS)
+    articles.tokenize(COLUMNS)
+    articles.remove_stop_words(COLUMNS)
+    
+    expected = Articles(other.copy(), stop_words=STOP_WORDS)
+    expected.replace_punctuations(COLUMNS)
+    expected.tokenize(COLUMNS)
+    expected.remove_stop_words(COLUMNS)
+    assert articles.dataframe.equals(expected.dataframe)
+
+def test_cache_after_column_is_modified(dataframe, tmp_path):
+    """
+    A column modified after a cached stage is hashed again by the next stage.
+    """
+    run_cached_stages(Articles(dataframe.copy(), stop_words=STOP_WORDS, cache_dir=str(tmp_path)))
+    
+    articles = Articles(dataframe.copy(), stop_words=STOP_WORDS, cache_dir=str(tmp_path))
+    articles.remove_noise(COLUMNS)
+    articles.dataframe.loc[0, 'TITLE'] = 'brand new words'
+    articles.replace_punctuations(COLUMNS)
+    articles.tokenize(COLUMNS)
+    
+    assert articles.dataframe.loc[0, 'TITLE'] == ['brand', 'new', 'words']
+
+def test_cache_warm_run(dataframe, tmp_path):
+    """
+    A run with all stages cached gives the same dataframe as without the cache.
+    """
+    for _ in range(2):
+        articles = Articles(dataframe.copy(), stop_words=STOP_WORDS, cache_dir=str(tmp_path))
+        run_cached_stages(articles)
+    
+    assert len(articles.pending_stages) == len(COLUMNS)
+    expected = Articles(dataframe.copy(), stop_words=STOP_WORDS)
+    run_cached_stages(expected)
+    assert articles.dataframe.equals(expected.dataframe)
+
+def test_add_articles_widens_date_range():
+    """
+    A default compute_trend() after add_articles() scores the added articles as
+    Articles of the combined dataframe.
+    """
+    first = generate_articles(40, seed=0, days=15)
+    second = generate_articles(40, seed=1)
+    second['DATE'] = second['DATE'].str.slice(0, 8) + '30'
+    
+    articles = Articles(first.copy(), stop_words=STOP_WORDS)
+    articles.preprocess(COLUMNS)
+    added = Articles(second.copy(), stop_words=STOP_WORDS)
+    added.preprocess(COLUMNS)
+    articles.add_articles(added.dataframe)
+    articles.compute_trend(COLUMNS, [5, 1])
+    
+    expected = Articles(pd.concat([first, second], ignore_index=True), stop_words=STOP_WORDS)
+    expected.preprocess(COLUMNS)
+    expected.compute_trend(COLUMNS, [5, 1])
+    
+    assert articles.max_date == '2013-06-30'
+    assert_same_scores(articles, expected)
+
+def test_add_articles_keeps_set_date_range(dataframe):
+    """
+    add_articles() does not widen a date range that was set.
+    """
+    articles = Articles(dataframe.copy(), stop_words=STOP_WORDS, 
+                        date_range=['2013-06-01', '2013-06-10'])
+    articles.preprocess(COLUMNS)
+    articles.add_articles(articles.dataframe.assign(DATE='2013-06-30'))
+    
+    assert [articles.min_date, articles.max_date] == ['2013-06-01', '2013-06-10']
+
+def preprocessed_articles(dataframe, intern=False, **kwargs):
+    articles = Articles(dataframe.copy(), stop_words=STOP_WORDS, **kwargs)
+    articles.preprocess(COLUMNS, intern=intern)
+    return articles
+
+@pytest.mark.parametrize('column_weights, date_range', [([], []), ([5, 1], []), 
+                                                         ([5, 1], ['2013-06-05', '2013-06-20'])])
+def test_matrix_backend(dataframe, column_weights, date_range):
+    """
+    The document-term matrix backend gives the same scores as the python backend.
+    """
+    expected = preprocessed_articles(dataframe)
+    expected.compute_trend(COLUMNS, list(column_weights), date_range)
+    
+    articles = preprocessed_articles(dataframe)
+    articles.compute_trend(COLUMNS, list(column_weights), date_range, backend='matrix')
+    
+    assert_same_scores(articles, expected)
+
+@pytest.mark.parametrize('column_weights, date_range', [([], []), ([5, 1], []), 
+                                                         ([5, 1], ['2013-06-05', '2013-06-20'])])
+def test_daily_backend(dataframe, column_weights, date_range):
+    """
+    The daily index backend gives the same scores as the python backend.
+    """
+    expected = preprocessed_articles(dataframe)
+    expected.compute_trend(COLUMNS, list(column_weights), date_range)
+    
+    articles = preprocessed_articles(dataframe)
+    articles.compute_trend(COLUMNS, list(column_weights), date_range, backend='daily')
+    
+    assert_same_scores(articles, expected)
+
+def test_daily_backend_after_add_articles(dataframe):
+    """
+    The buckets updated by add_articles() give the same scores as the daily index of
+    all articles.
+    """
+    other = generate_articles(30, seed=1)
+    expected = preprocessed_articles(pd.concat([dataframe, other], ignore_index=True))
+    expected.compute_trend(COLUMNS, [5, 1], backend='daily')
+    
+    articles = preprocessed_articles(dataframe)
+    articles.compute_trend(COLUMNS, [5, 1], backend='daily')
+    articles.add_articles(preprocessed_articles(other).dataframe)
+    articles.compute_trend(COLUMNS, [5, 1], backend='daily')
+    
+    assert_same_scores(articles, expected)
+
+def test_compute_trend_scores():
+    """
+    Scores of two short articles computed by hand (weights [3, 1] are normalized to
+    [0.75, 0.25]).
+    """
+    dataframe = generate_articles(2)
+    dataframe['DATE'] = '2013-06-01'
+    dataframe['TITLE'] = ['oil oil bank', 'bank']
+    dataframe['TEXT'] = ['oil', 'fed']
+    
+    articles = preprocessed_articles(dataframe)
+    articles.compute_trend(COLUMNS)
+    assert dict(articles.trend_count_score) == {'oil': 3, 'bank': 2, 'fed': 1}
+    assert dict(articles.trend_text_score) == {'oil': 2, 'bank': 2, 'fed': 1}
+    assert dict(articles.trend_norm_score) == pytest.approx({'oil': 5/3, 'bank': 4/3, 'fed': 1})
+    
+    articles.compute_trend(COLUMNS, [3, 1])
+    assert dict(articles.trend_count_score) == pytest.approx({'oil': 1.75, 'bank': 1.5, 'fed': 0.25})
+    assert dict(articles.trend_text_score) == pytest.approx({'oil': 1, 'bank': 1.5, 'fed': 0.25})
+    assert dict(articles.trend_norm_score) == pytest.approx({'oil': 0.75, 'bank': 1, 'fed': 0.25})
+
+def test_add_to_loaded_trend_scores(dataframe, tmp_path):
+    """
+    Scores loaded from .json files can be added to by compute_trend(reset=False).
+    """
+    other = generate_articles(30, seed=1)
+    saved = preprocessed_articles(dataframe)
+    saved.compute_trend(COLUMNS)
+    saved.save_trend_scores(str(tmp_path), date_prefix=False)
+
+    articles = preprocessed_articles(other)
+    for method in ['count', 'text', 'norm']:
+        articles.load_trend_scores(method, str(tmp_path / ('trend_' + method + '_score.json')),
+                                   date_prefix=False)
+    articles.compute_trend(COLUMNS, reset=False)
+
+    expected = preprocessed_articles(other)
+    expected.compute_trend(COLUMNS)
+    for method in ['count', 'text', 'norm']:
+        scores = getattr(expected, 'trend_' + method + '_score')
+        for token, score in getattr(saved, 'trend_' + method + '_score').items():
+            scores[token] += score
+
+    assert_same_scores(articles, expected)
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_preprocess(dataframe, workers):
+    """
+    preprocess() gives the same tokens as calling each step, with or without worker
+    processes.
+    """
+    expected = Articles(dataframe.copy(), stop_words=STOP_WORDS)
+    run_cached_stages(expected)
+    
+    articles = Articles(dataframe.copy(), stop_words=STOP_WORDS)
+    articles.preprocess(COLUMNS, workers=workers, chunk_size=7)
+    
+    assert articles.dataframe.equals(expected.dataframe)
+    assert articles.tokenized_columns == set(COLUMNS)
+
+def test_parquet(dataframe, tmp_path):
+    """
+    Tokenized and set columns are restored by load_parquet(), and date_range only 
+    reads the rows within it.
+    """
+    articles = preprocessed_articles(dataframe)
+    articles.save_parquet(str(tmp_path))
+    file = str(tmp_path / 'articles_dataframe.parquet')
+    
+    loaded = Articles(dataframe.copy())
+    loaded.load_parquet(file)
+    assert loaded.tokenized_columns == set(COLUMNS)
+    assert loaded.dataframe.reset_index(drop=True).equals(articles.dataframe.reset_index(drop=True))
+    
+    loaded.load_parquet(file, columns=['DATE', 'TITLE'], date_range=['2013-06-05', '2013-06-10'])
+    expected = articles.dataframe.loc[articles.dataframe['DATE'].between('2013-06-05', '2013-06-10'),
+                                      ['DATE', 'TITLE']]
+    assert loaded.dataframe.reset_index(drop=True).equals(expected.reset_index(drop=True))
+    assert [loaded.min_date, loaded.max_date] == ['2013-06-05', '2013-06-10']
+
+def test_get_trending_words(dataframe):
+    """
+    The top (or bottom) n trending words selected with a heap are those of sorting
+    all tokens (ties in insertion order).
+    """
+    articles = preprocessed_articles(dataframe)
+    articles.compute_trend(COLUMNS)
+    
+    for method in ['count', 'text', 'norm']:
+        rank = sorted(getattr(articles, 'trend_'+method+'_score').items(), 
+                      key=lambda item: item[1], reverse=True)
+        for n in [1, 5, 12]:
+            assert articles.get_trending_words(method, n) == rank[:n]
+            assert articles.get_trending_words(method, n, top=False) == rank[-n:]
+        assert articles.get_trending_words(method, 0, top=False) == rank
+
+def test_interned_tokens(dataframe, tmp_path):
+    """
+    Interned columns decode to the same tokens, give the same scores with each 
+    backend and are saved as lists of tokens.
+    """
+    expected = preprocessed_articles(dataframe)
+    expected.compute_trend(COLUMNS, [5, 1])
+    
+    articles = preprocessed_articles(dataframe, intern=True)
+    for column in COLUMNS:
+        assert articles.get_token_lists(column) == list(expected.dataframe[column])
+    for backend in ['python', 'daily']:
+        articles.compute_trend(COLUMNS, [5, 1], backend=backend)
+        assert_same_scores(articles, expected)
+    
+    articles.save_dataframe(str(tmp_path))
+    saved = pd.read_csv(str(tmp_path / 'articles_dataframe.csv'))
+    assert list(saved['TITLE']) == [str(tokens) for tokens in expected.dataframe['TITLE']]
+
+def test_interned_remove_stop_words(dataframe):
+    articles = Articles(dataframe.copy())
+    articles.preprocess(COLUMNS, intern=True)
+    articles.stop_words = StopWordFilter(['oil', 'bank'])
+    articles.remove_stop_words(COLUMNS)
+    
+    for column in COLUMNS:
+        assert all('oil' not in tokens and 'bank' not in tokens
+                   for tokens in articles.get_token_lists(column))
+
+def test_compute_trends(dataframe):
+    """
+    compute_trends() gives the scores of compute_trend() for each window and 
+    configuration, without modifying the scores of the articles.
+    """
+    windows = [['2013-06-01', '2013-06-07'], ['2013-06-05', '2013-06-30']]
+    configs = [(['TITLE'], []), (COLUMNS, [5, 1])]
+    
+    articles = preprocessed_articles(dataframe)
+    trends = articles.compute_trends(windows, configs)
+    assert len(articles.trend_count_score) == 0
+    
+    for min_date, max_date in windows:
+        for i, (columns, column_weights) in enumerate(configs):
+            expected = preprocessed_articles(dataframe)
+            expected.compute_trend(columns, list(column_weights), [min_date, max_date])
+            
+            scores = trends[(min_date, max_date, i)]
+            for method in ['count', 'text', 'norm']:
+                expected_scores = getattr(expected, 'trend_'+method+'_score')
+                assert {token: score for token, score in scores[method].items() if score != 0} == \
+                    pytest.approx({token: score for token, score in expected_scores.items() 
+                                   if score != 0})
+
+def test_compute_velocity():
+    """
+    Velocity scores of the text method computed by hand (the baseline is the 3 days
+    before the target window, and days without articles count as 0).
+    """
+    dataframe = generate_articles(5)
+    dataframe['DATE'] = ['2013-06-01', '2013-06-02', '2013-06-04', '2013-06-05', '2013-06-06']
+    dataframe['TITLE'] = ['oil', 'bank', 'oil', 'oil oil', 'bank']
+    
+    articles = preprocessed_articles(dataframe)
+    articles.compute_velocity(['TITLE'], date_range=['2013-06-04', '2013-06-06'])
+    assert articles.trend_velocity_score['oil'] == pytest.approx((2/3 + 1) / (1/3 + 1))
+    assert articles.trend_velocity_score['bank'] == pytest.approx(1)
+    
+    articles.compute_velocity(['TITLE'], date_range=['2013-06-04', '2013-06-06'], 
+                              velocity='zscore')
+    assert articles.trend_velocity_score['oil'] == pytest.approx((2/3 - 1/3) / ((2/9)**0.5 + 1))
+    assert articles.get_trending_words('velocity', 1) == [('oil', articles.trend_velocity_score['oil'])]
+
+def test_token_series_and_top_articles(dataframe):
+    """
+    The daily series of a token sum to its trend score, and its top articles are
+    those with the most occurrences.
+    """
+    articles = preprocessed_articles(dataframe)
+    articles.compute_trend(COLUMNS, [5, 1])
+    
+    for method in ['count', 'text', 'norm']:
+        series = articles.get_token_series('oil', COLUMNS, [5, 1], method)
+        assert [date for date, _ in series] == sorted(set(date for date, _ in series))
+        assert sum(score for _, score in series) == \
+            pytest.approx(getattr(articles, 'trend_'+method+'_score')['oil'])
+    
+    counts = articles.dataframe['TEXT'].apply(lambda tokens: tokens.count('oil'))
+    top_articles = articles.get_top_articles('oil', ['TEXT'], n=3)
+    assert [score for _, _, score in top_articles] == sorted(counts, reverse=True)[:3]
+    for article_id, date, score in top_articles:
+        row = articles.dataframe.loc[articles.dataframe['ID'] == article_id].iloc[0]
+        assert (row['DATE'], row['TEXT'].count('oil')) == (date, score)
+
+def test_lazy_collect(dataframe):
+    """
+    In lazy mode, compute_trend() only pre-processes the rows within its date range
+    and its columns, and gives the same scores as in eager mode.
+    """
+    date_range = ['2013-06-05', '2013-06-20']
+    expected = preprocessed_articles(dataframe)
+    expected.compute_trend(['TITLE'], [], date_range)
+    
+    articles = Articles(dataframe.copy(), stop_words=STOP_WORDS, lazy=True)
+    articles.remove_noise(COLUMNS)
+    articles.normalize(COLUMNS)
+    articles.tokenize(COLUMNS)
+    articles.remove_stop_words(COLUMNS)
+    assert articles.dataframe.equals(dataframe)
+    
+    articles.compute_trend(['TITLE'], [], date_range)
+    assert_same_scores(articles, expected)
+    assert articles.dataframe['DATE'].between(*date_range).all()
+    assert [name for name, _ in articles.plan] == ['remove_noise', 'normalize', 'tokenize',
+                                                   'remove_stop_words']
+    assert all(arguments['columns'] == ['TEXT'] for _, arguments in articles.plan)
+    
+    articles.collect()
+    assert articles.plan == []
+    assert list(articles.dataframe['TEXT']) == \
+        list(expected.dataframe.loc[articles.dataframe.index, 'TEXT'])
+    
+    with pytest.raises(ValueError):
+        articles.compute_trend(['TITLE'], [], ['2013-06-01', '2013-06-30'])
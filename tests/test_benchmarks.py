@@ -0,0 +1,38 @@
+"""
+Tests of the benchmark suite.
+
+Name:   Arnold YS Yeung
+Date:   2026-10-17
+"""
+
+import pytest
+
+import benchmarks
+
+
+def test_check_outputs():
+    benchmarks.check_outputs(100, num_words=50)
+
+def test_check_outputs_detects_differences(monkeypatch):
+    reformat = benchmarks.TRArticles.reformat
+    monkeypatch.setattr(benchmarks.TRArticles, 'reformat', 
+                        lambda self, spec, keep=False: reformat(self, spec, keep).iloc[1:])
+    with pytest.raises(ValueError, match='reformat'):
+        benchmarks.check_outputs(20, num_words=20)
+
+def test_run_benchmarks():
+    """
+    Each step of both classes is timed on a small corpus.
+    """
+    results = benchmarks.run_benchmarks([50], num_words=20, repeat=1, output=None)
+    
+    methods = [(result['class'], result['method']) for result in results['benchmarks']]
+    assert methods == [('TRArticles', name) for name, _, _ in benchmarks.TR_STEPS] + \
+        [('Articles', name) for name, _, _ in benchmarks.ARTICLES_STEPS]
+    assert all(result['time'] >= 0 and result['peak_memory'] > 0 
+               for result in results['benchmarks'])
+
+def test_benchmark_normalizer():
+    result = benchmarks.benchmark_normalizer(num_texts=5, num_words=50, repeat=1)
+    
+    assert result['speedup'] > 0
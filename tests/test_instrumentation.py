@@ -0,0 +1,67 @@
+"""
+Tests of the per-call metrics of the pipelines.
+
+Name:   Arnold YS Yeung
+Date:   2026-10-17
+"""
+
+import json
+
+import pytest
+
+from articles import Articles
+from instrumentation import PipelineMetrics
+from tr_preprocessing import TRArticles
+
+from conftest import generate_tr_articles, STOP_WORDS, TR_SPEC
+
+COLUMNS = ['TITLE', 'TEXT']
+
+
+def test_metrics_records(dataframe, tmp_path):
+    """
+    Each call records its rows, tokens and nesting depth, and callbacks receive each
+    record.
+    """
+    received = []
+    metrics = PipelineMetrics(callbacks=[received.append], trace_memory=True)
+    articles = Articles(dataframe.copy(), stop_words=STOP_WORDS, metrics=metrics)
+    articles.preprocess(COLUMNS)
+    articles.compute_trend(COLUMNS, backend='matrix')
+    
+    assert received == metrics.records
+    preprocess = metrics.records[0]
+    assert (preprocess['class'], preprocess['method'], preprocess['depth']) == \
+        ('Articles', 'preprocess', 0)
+    assert preprocess['rows_in'] == preprocess['rows_out'] == len(dataframe)
+    assert preprocess['tokens'] == sum(len(tokens) for column in COLUMNS 
+                                       for tokens in articles.dataframe[column])
+    assert preprocess['peak_memory'] > 0 and preprocess['error'] is None
+    
+    nested = [record for record in metrics.records if record['depth'] == 1]
+    assert [record['method'] for record in nested] == ['build_term_matrix']
+    assert list(metrics.summary()) == ['Articles.preprocess', 'Articles.compute_trend']
+    
+    metrics.save(str(tmp_path / 'metrics.json'))
+    with open(str(tmp_path / 'metrics.json')) as fp:
+        assert json.load(fp) == metrics.records
+
+def test_metrics_error(dataframe):
+    metrics = PipelineMetrics()
+    articles = Articles(dataframe.copy(), metrics=metrics)
+    with pytest.raises(ValueError):
+        articles.compute_trend(COLUMNS, backend='invalid')
+    
+    assert metrics.records[-1]['error'] == 'ValueError'
+    assert metrics.depth == 0
+
+def test_metrics_reformat():
+    """
+    reformat() records the rows of the returned dataframe.
+    """
+    metrics = PipelineMetrics()
+    dataframe = generate_tr_articles(50)
+    reformatted = TRArticles(dataframe, ['EN'], metrics=metrics).reformat(TR_SPEC)
+    
+    assert (metrics.records[0]['rows_in'], metrics.records[0]['rows_out']) == \
+        (len(dataframe), len(reformatted))
@@ -0,0 +1,65 @@
+"""
+Tests of the headless rendering of trend charts.
+
+Name:   Arnold YS Yeung
+Date:   2026-10-17
+"""
+
+import os
+
+import pytest
+
+from articles import Articles
+from rendering import ChartRenderer, get_chart, render_charts
+
+from conftest import STOP_WORDS
+
+COLUMNS = ['TITLE', 'TEXT']
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+def test_get_chart():
+    chart = get_chart([('oil', 3), ('bank', 2.5)], 'norm', 2, False, '2013-06-01', '2013-06-30')
+    
+    assert chart == {'tokens': ['oil', 'bank'], 'scores': [3.0, 2.5],
+                     'title': 'Bottom 2 trending words (2013-06-01 to 2013-06-30)',
+                     'ylabel': 'norm score', 'file': None}
+
+def test_renderer_reuses_figure(tmp_path):
+    """
+    Charts are drawn on the same axes, which only keep the ticks of the last chart.
+    """
+    renderer = ChartRenderer()
+    first = renderer.render(get_chart([('oil', 3), ('bank', 2)]))
+    file = str(tmp_path / 'chart.png')
+    assert renderer.render(get_chart([('fed', 1)], file=file)) is None
+    
+    assert first.startswith(PNG_SIGNATURE)
+    with open(file, 'rb') as fp:
+        assert fp.read().startswith(PNG_SIGNATURE)
+    assert [tick.get_text() for tick in renderer.axes.get_xticklabels()] == ['fed']
+    assert len(renderer.figure.axes) == 1
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_render_trends(dataframe, tmp_path, workers):
+    """
+    The charts of each method (and window) are returned as images or written to files.
+    """
+    articles = Articles(dataframe.copy(), stop_words=STOP_WORDS)
+    articles.preprocess(COLUMNS)
+    articles.compute_trend(COLUMNS)
+    
+    images = articles.render_trends(['count', 'norm'], n=5, workers=workers)
+    assert sorted(images) == ['count', 'norm']
+    assert all(image.startswith(PNG_SIGNATURE) for image in images.values())
+    
+    trends = articles.compute_trends([['2013-06-01', '2013-06-15']], [(COLUMNS, [])])
+    files = articles.render_trends(['text'], trends=trends, save_loc=str(tmp_path), 
+                                   format='svg', workers=workers)
+    assert list(files) == [('2013-06-01', '2013-06-15', 0, 'text')]
+    assert all(os.path.exists(file) for file in files.values())
+
+def test_render_charts_chunks():
+    charts = [get_chart([('oil', i)]) for i in range(5)]
+    
+    assert len(render_charts(charts, workers=2, chunk_size=2)) == 5
@@ -0,0 +1,60 @@
+"""
+Tests of the binary score store.
+
+Name:   Arnold YS Yeung
+Date:   2026-10-17
+"""
+
+from articles import Articles
+from score_store import ScoreStore, save_score_store
+
+from conftest import STOP_WORDS
+
+COLUMNS = ['TITLE', 'TEXT']
+
+
+def test_store_scores(tmp_path):
+    """
+    Scores are read back with their types, and tokens without a score are None.
+    """
+    file = str(tmp_path / 'scores.bin')
+    save_score_store(file, {'oil': 3, 'bank': 1}, {'oil': 0.5}, {'bank': 0.25, 'fed': 0.75},
+                     '2013-06-01', '2013-06-30')
+    store = ScoreStore(file)
+    
+    assert len(store) == 3
+    assert [store.min_date, store.max_date] == ['2013-06-01', '2013-06-30']
+    assert store.get_score('oil', 'count') == 3 and isinstance(store.get_score('oil'), int)
+    assert store.get_score('fed', 'count') is None
+    assert store.get_score('tax', 'norm') is None
+    assert store.get_scores('norm') == {'fed': 0.75, 'bank': 0.25}
+
+def test_store_trending_words_ties(tmp_path):
+    """
+    Ties are ranked in the insertion order of the scores (as in memory).
+    """
+    file = str(tmp_path / 'scores.bin')
+    scores = {'tax': 2, 'oil': 1, 'bank': 2, 'fed': 1}
+    save_score_store(file, scores, scores, scores)
+    store = ScoreStore(file)
+    
+    assert store.get_trending_words('count', 2) == [('tax', 2), ('bank', 2)]
+    assert store.get_trending_words('count', 2, top=False) == [('oil', 1), ('fed', 1)]
+
+def test_store_trending_words(dataframe, tmp_path):
+    """
+    The trending words of a reloaded store are the same as the ones in memory,
+    including ties and the bottom 0 (all tokens).
+    """
+    articles = Articles(dataframe.copy(), stop_words=STOP_WORDS)
+    articles.preprocess(COLUMNS)
+    articles.compute_trend(COLUMNS)
+    articles.save_trend_store(str(tmp_path), date_prefix=False)
+    
+    loaded = Articles(dataframe.copy())
+    loaded.load_trend_store(str(tmp_path / 'trend_scores.bin'))
+    
+    for method in ['count', 'text', 'norm']:
+        for n, top in [(3, True), (3, False), (0, True), (0, False), (100, True)]:
+            assert loaded.get_trending_words(method, n, top) == \
+                articles.get_trending_words(method, n, top)
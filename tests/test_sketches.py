@@ -0,0 +1,63 @@
+"""
+Tests of the approximate streaming trend scores.
+
+Name:   Arnold YS Yeung
+Date:   2026-10-17
+"""
+
+import pytest
+
+from articles import Articles
+from sketches import CountMinSketch, HeavyHitters, StreamingTrendScorer
+
+from conftest import STOP_WORDS
+
+COLUMNS = ['TITLE', 'TEXT']
+
+
+def test_count_min_sketch():
+    """
+    Estimates are never below the true scores, and exact without collisions.
+    """
+    sketch = CountMinSketch(width=8, depth=3)
+    scores = {'token'+str(i): float(i % 5 + 1) for i in range(50)}
+    for token, score in scores.items():
+        sketch.add([token], [score])
+    
+    assert sketch.total == sum(scores.values())
+    assert all(sketch.estimate(token) >= score for token, score in scores.items())
+    
+    wide_sketch = CountMinSketch(epsilon=1e-5, delta=1e-3)
+    wide_sketch.add(list(scores), list(scores.values()))
+    assert all(wide_sketch.estimate(token) == score for token, score in scores.items())
+    
+    with pytest.raises(ValueError):
+        sketch.merge(wide_sketch)
+
+def test_heavy_hitters():
+    heavy_hitters = HeavyHitters(capacity=2)
+    for token, score in [('a', 1), ('b', 3), ('c', 2), ('a', 4), ('d', 0.5)]:
+        heavy_hitters.update(token, score)
+    
+    assert heavy_hitters.get_top(3) == [('a', 4), ('b', 3)]
+
+def test_streaming_trend_scorer(dataframe):
+    """
+    The top trending words and their scores are those of Articles (without collisions).
+    """
+    articles = Articles(dataframe.copy(), stop_words=STOP_WORDS)
+    articles.preprocess(COLUMNS)
+    articles.compute_trend(COLUMNS, [5, 1])
+    
+    scorer = StreamingTrendScorer(COLUMNS, [5, 1], stop_words=STOP_WORDS, capacity=30,
+                                  epsilon=1e-5, delta=1e-3)
+    scorer.add_dataframe(dataframe)
+    
+    assert scorer.num_articles == len(dataframe)
+    assert [scorer.min_date, scorer.max_date] == [articles.min_date, articles.max_date]
+    for method in ['count', 'text', 'norm']:
+        top = scorer.get_trending_words(method, 5)
+        expected = articles.get_trending_words(method, 5)
+        assert [score for _, score in top] == pytest.approx([score for _, score in expected])
+        assert all(scorer.get_trend_score(token, method) == pytest.approx(score) 
+                   for token, score in expected)
@@ -0,0 +1,56 @@
+"""
+Tests of the streaming computation of trend scores.
+
+Name:   Arnold YS Yeung
+Date:   2026-10-17
+"""
+
+import pandas as pd
+import pytest
+
+from articles import Articles
+from streaming import stream_trend_scores
+from tr_preprocessing import TRArticles
+
+from conftest import generate_tr_articles, assert_same_scores, STOP_WORDS, TR_SPEC
+
+COLUMNS = ['TITLE', 'TEXT']
+
+
+@pytest.fixture
+def raw_file(tmp_path):
+    file = str(tmp_path / 'raw.csv')
+    generate_tr_articles(300, seed=3).to_csv(file, index=False)
+    return file
+
+
+@pytest.mark.parametrize('chunksize', [13, 97, 1000])
+def test_stream_same_as_whole_file(raw_file, chunksize):
+    """
+    Takes of a story which fall into different chunks are joined as in the whole file.
+    """
+    expected = Articles(TRArticles(pd.read_csv(raw_file), ['EN']).reformat(TR_SPEC), 
+                        stop_words=STOP_WORDS)
+    expected.preprocess(COLUMNS)
+    expected.compute_trend(COLUMNS, [5, 1])
+    
+    articles = stream_trend_scores(raw_file, TR_SPEC, COLUMNS, [5, 1], stop_words=STOP_WORDS,
+                                   chunksize=chunksize)
+    
+    assert [articles.min_date, articles.max_date] == [expected.min_date, expected.max_date]
+    assert_same_scores(articles, expected)
+
+def test_stream_workers(raw_file):
+    """
+    Chunks pre-processed by worker processes give the same scores.
+    """
+    expected = stream_trend_scores(raw_file, TR_SPEC, COLUMNS, stop_words=STOP_WORDS, 
+                                   chunksize=97)
+    articles = stream_trend_scores(raw_file, TR_SPEC, COLUMNS, stop_words=STOP_WORDS, 
+                                   chunksize=97, workers=2)
+    
+    assert_same_scores(articles, expected)
+
+def test_stream_invalid_carry_chunks(raw_file):
+    with pytest.raises(ValueError):
+        stream_trend_scores(raw_file, TR_SPEC, COLUMNS, carry_chunks=0)
@@ -0,0 +1,85 @@
+"""
+Tests of TRArticles.
+
+Name:   Arnold YS Yeung
+Date:   2026-10-17
+"""
+
+import asyncio
+
+import pandas as pd
+
+from tr_preprocessing import TRArticles, load_files
+
+from conftest import generate_tr_articles, TR_SPEC
+
+
+
+def test_remove_duplicate_ids():
+    """
+    The first row of each ID is kept, with its fill_columns filled from its later rows.
+    """
+    dataframe = pd.DataFrame({'ID': ['a', 'a', 'b', 'a', 'b'], 
+                              'TITLE': [None, 'x', 'y', 'z', None],
+                              'TEXT': [None, None, None, 't', 'u'],
+                              'TIME': [1, 2, 3, 4, 5]})
+    articles = TRArticles(dataframe)
+    articles.remove_duplicate_ids('ID', ['TITLE', 'TEXT'])
+    
+    assert articles.dataframe.to_dict('list') == {'ID': ['a', 'b'], 'TITLE': ['x', 'y'],
+                                                  'TEXT': ['t', 'u'], 'TIME': [1, 3]}
+
+def reformat_steps(dataframe, spec):
+    articles = TRArticles(dataframe, ['EN'])
+    articles.filter_language()
+    articles.remove_duplicate_ids(spec['identifier'], spec['fill_columns'])
+    for column, internal_calls in spec['internal_calls'].items():
+        articles.remove_internal_calls(column, internal_calls)
+    articles.convert_string_to_set(spec['set_columns'])
+    articles.concatenate_columns(spec['concatenate_columns'], remove=True)
+    return articles.reformat_dataframe(spec['rename'], spec['drop_columns'])
+
+def test_reformat():
+    """
+    reformat(spec) gives the same dataframe as running each step.
+    """
+    dataframe = generate_tr_articles(200)
+    
+    expected = reformat_steps(dataframe.copy(), TR_SPEC)
+    articles = TRArticles(dataframe.copy(), ['EN'])
+    reformatted = articles.reformat(TR_SPEC)
+    
+    assert reformatted.equals(expected)
+    assert articles.dataframe.equals(dataframe)
+    assert articles.reformat(TR_SPEC, keep=True).equals(articles.dataframe)
+
+def test_load_files(tmp_path):
+    """
+    Each file is read and reformatted once, as TRArticles.reformat() of the file.
+    """
+    files = []
+    for seed in range(3):
+        files.append(str(tmp_path / ('raw'+str(seed)+'.csv')))
+        generate_tr_articles(50, seed).to_csv(files[-1], index=False)
+    
+    async def load():
+        return [(file, dataframe) async for file, dataframe 
+                in load_files(files, TR_SPEC, ['EN'], workers=2)]
+    loaded = dict(asyncio.run(load()))
+    
+    assert sorted(loaded) == files
+    for file in files:
+        assert loaded[file].equals(TRArticles(pd.read_csv(file), ['EN']).reformat(TR_SPEC))
+
+def test_parquet(tmp_path):
+    """
+    A reformatted dataframe (with set columns) is restored by load_parquet().
+    """
+    articles = TRArticles(generate_tr_articles(50), ['EN'])
+    articles.reformat(TR_SPEC, keep=True)
+    articles.save_parquet(str(tmp_path))
+    
+    loaded = TRArticles(None)
+    loaded.load_parquet(str(tmp_path / 'articles_dataframe.parquet'))
+    
+    assert loaded.dataframe.reset_index(drop=True).equals(articles.dataframe.reset_index(drop=True))
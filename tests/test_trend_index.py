@@ -0,0 +1,100 @@
+"""
+Tests of the daily index of partial trend scores.
+
+Name:   Arnold YS Yeung
+Date:   2026-10-17
+"""
+
+import pytest
+
+from articles import Articles
+from trend_index import DailyTrendIndex, TrendSnapshot
+
+from conftest import assert_same_scores, STOP_WORDS
+
+COLUMNS = ['TITLE', 'TEXT']
+
+
+def tokenized(dataframe):
+    return dataframe.assign(**{column: dataframe[column].str.split() for column in COLUMNS})
+
+def build_index(dataframe, cache_size=1024):
+    index = DailyTrendIndex(cache_size)
+    index.add_dataframe(tokenized(dataframe), COLUMNS)
+    return index
+
+def velocity(index, date_range):
+    return index.compute_velocity(date_range, DailyTrendIndex.get_baseline_range(date_range),
+                                  COLUMNS, [5, 1])
+
+
+def test_cache_is_bounded(dataframe):
+    """
+    Sliding the target window keeps at most cache_size cached entries.
+    """
+    index = build_index(dataframe, cache_size=20)
+    for day in range(8, 31):
+        velocity(index, ['2013-06-%02d' % (day-6), '2013-06-%02d' % day])
+        assert len(index.cache) <= 20
+
+def test_cache_after_add_dataframe(dataframe):
+    """
+    Adding articles only drops the cached entries of their dates, and the scores
+    are the same as those of an index of all articles.
+    """
+    first = dataframe.loc[dataframe['DATE'] < '2013-06-25']
+    second = dataframe.loc[dataframe['DATE'] >= '2013-06-25']
+    
+    index = build_index(first)
+    velocity(index, ['2013-06-01', '2013-06-07'])
+    velocity(index, ['2013-06-24', '2013-06-30'])
+    num_entries = len(index.cache)
+    
+    index.add_dataframe(tokenized(second), COLUMNS)
+    assert 0 < len(index.cache) < num_entries
+    
+    expected = build_index(dataframe)
+    for date_range in [['2013-06-01', '2013-06-07'], ['2013-06-24', '2013-06-30']]:
+        assert velocity(index, date_range) == pytest.approx(velocity(expected, date_range))
+
+def test_cache_after_remove_columns(dataframe):
+    """
+    Removing a column drops the cached entries of its scores.
+    """
+    index = build_index(dataframe)
+    velocity(index, ['2013-06-01', '2013-06-07'])
+    index.compute_velocity(['2013-06-01', '2013-06-07'], ['2013-05-25', '2013-05-31'], ['TITLE'])
+    
+    index.remove_columns(['TEXT'])
+    assert len(index.cache) > 0
+    for key in index.cache:
+        #   ('day', date, columns, ...) or ('window', min_date, max_date, columns, ...)
+        assert 'TEXT' not in (key[2] if key[0] == 'day' else key[3])
+
+def test_merged_snapshots(dataframe, tmp_path):
+    """
+    Snapshots of two halves of the dates (one saved and loaded) merge into the scores
+    of all articles: exactly for the unweighted count and text scores.
+    """
+    articles = Articles(dataframe.copy(), stop_words=STOP_WORDS)
+    articles.preprocess(COLUMNS)
+    first = articles.compute_trend_snapshot(COLUMNS, ['2013-06-01', '2013-06-15'])
+    second = articles.compute_trend_snapshot(COLUMNS, ['2013-06-16', '2013-06-30'])
+    second.save(str(tmp_path / 'snapshot.json'))
+    second = TrendSnapshot.load(str(tmp_path / 'snapshot.json'))
+    
+    expected = Articles(dataframe.copy(), stop_words=STOP_WORDS, 
+                        date_range=['2013-06-01', '2013-06-30'])
+    expected.preprocess(COLUMNS)
+    expected.compute_trend(COLUMNS)
+    
+    merged = Articles(dataframe.copy())
+    merged.merge_trend_snapshots([first, second], COLUMNS)
+    assert [merged.min_date, merged.max_date] == ['2013-06-01', '2013-06-30']
+    assert dict(merged.trend_count_score) == dict(expected.trend_count_score)
+    assert dict(merged.trend_text_score) == dict(expected.trend_text_score)
+    assert_same_scores(merged, expected)
+    
+    expected.compute_trend(COLUMNS, [5, 1])
+    merged.merge_trend_snapshots([first + second], COLUMNS, [5, 1])
+    assert_same_scores(merged, expected)
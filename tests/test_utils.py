@@ -0,0 +1,53 @@
+"""
+Tests of the text pre-processing functions.
+
+Name:   Arnold YS Yeung
+Date:   2026-10-17
+"""
+
+import pickle
+import random
+
+from utils import StopWordFilter, remove_stop_words, normalize_text, preprocess_text
+from benchmarks import _normalize_chain
+
+from conftest import generate_text, STOP_WORDS
+
+
+def test_stop_word_filter():
+    """
+    The filter removes the same tokens as a list of stop words (and tokens with digits).
+    """
+    stop_words = StopWordFilter(STOP_WORDS)
+    tokens = ['said', 'oil', 'q1', '2013', 'the', 'market', 'percent', 'g20s']
+    
+    assert 'said' in stop_words and 'q1' in stop_words and 'oil' not in stop_words
+    assert len(stop_words) == len(STOP_WORDS)
+    assert remove_stop_words(tokens, stop_words) == remove_stop_words(tokens, STOP_WORDS) == \
+        ['oil', 'market']
+
+def test_stop_word_filter_pickle():
+    stop_words = pickle.loads(pickle.dumps(StopWordFilter(STOP_WORDS)))
+    
+    assert isinstance(stop_words, StopWordFilter)
+    assert stop_words.words == frozenset(STOP_WORDS)
+
+def test_normalize_text():
+    """
+    The normalizer gives the same output as the previous chain of steps, including
+    entities, newlines and tabs within words and URLs.
+    """
+    rng = random.Random(0)
+    texts = ['', ' ', 'http://x.com', 'a http://x.com b', 'www.x.com, b', 'ban\nk oi\tl',
+             'AT&amp;T &lt;b&gt; &#65;BC', ' \nhttp://x.com a', 'a  b\t\t c', 'caf\u00e9 na\u00efve']
+    texts += [generate_text(rng, 50) for _ in range(50)]
+    
+    for text in texts:
+        assert normalize_text(text) == _normalize_chain(text)
+    assert normalize_text('A, b', replacement='_', lower=False) == 'A_b'
+
+def test_preprocess_text():
+    stop_words = StopWordFilter(STOP_WORDS)
+    
+    assert preprocess_text('Oil said 2013, http://x.com MARKET\n!', stop_words) == ['oil', 'market']
+    assert preprocess_text('a-b c', sep=' ') == ['a', 'b', 'c']
@@ -5,16 +5,27 @@ Name:   Arnold YS Yeung
 Date:   2020-12-11
 """
 
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
+import numpy as np
+
+from utils import read_parquet, write_parquet
+from instrumentation import instrument
 
 class TRArticles:
     
-    def __init__(self, dataframe, languages=['en'], verbose=False):
+    def __init__(self, dataframe, languages=['en'], verbose=False, metrics=None):
         
         self.dataframe = dataframe
         self.languages = languages
         self.verbose = verbose
         
+        #   instrumentation.PipelineMetrics recording each call (if not None)
+        self.metrics = metrics
+        
+    @instrument
     def remove_duplicate_ids(self, identifier, fill_columns=[]):
         """
         Remove duplicate articles based on identifier.
@@ -29,21 +40,17 @@ class TRArticles:
             print("Removing duplicate IDs based on: ", identifier)
             before_num_rows = self.dataframe.shape[0]
             
-        #   get rows where fill_columns are not NaN
-        if fill_columns != []:    
-            fill_df = {}
-            for fill_column in fill_columns:
-                #   create a map for filling in remaining rows which have missing values in fill_column
-                fill_df[fill_column] = self.dataframe.set_index(identifier)[fill_column].dropna()
-                fill_df[fill_column] = fill_df[fill_column].groupby(fill_df[fill_column].index).first()            
-                fill_df[fill_column] = self.dataframe[identifier].map(fill_df[fill_column])
-                        
+        #   first non-NaN value of each fill_column for each identifier (in a single groupby)
+        if fill_columns != []:
+            fill_df = self.dataframe.groupby(identifier, sort=False)[fill_columns].first()
+        
         self.dataframe = self.dataframe.drop_duplicates(subset=identifier)
         
         if fill_columns != []:
-            for fill_column in fill_columns:
-                #   fill in remaining rows which have missing values in fill_column with map
-                self.dataframe[fill_column] = self.dataframe[fill_column].fillna(fill_df[fill_column])
+            #   fill in remaining rows which have missing values in fill_columns
+            fill_df = fill_df.reindex(self.dataframe[identifier])
+            fill_df.index = self.dataframe.index
+            self.dataframe[fill_columns] = self.dataframe[fill_columns].fillna(fill_df)
     
         if self.verbose:
             after_num_rows = self.dataframe.shape[0]
@@ -53,6 +60,7 @@ class TRArticles:
                   "%) were removed.")
         return  
     
+    @instrument
     def remove_internal_calls(self, column, internal_calls=[]):
         """
         Remove all rows where column starts with one of the internal_calls. internal_calls
@@ -77,6 +85,7 @@ class TRArticles:
         
         return
     
+    @instrument
     def filter_language(self):
         """
         Filters out all languages aside from those in self.languages.
@@ -100,6 +109,7 @@ class TRArticles:
         
         return
     
+    @instrument
     def concatenate_columns(self, columns, new_column="", remove=False):
         """
         Concatenate the values of two columns to combine the columns. If remove, remove
@@ -133,6 +143,7 @@ class TRArticles:
         
         return
     
+    @instrument
     def convert_string_to_set(self, columns=[], sep=" "):
         """
         Convert tokens within a string to a set.
@@ -152,6 +163,7 @@ class TRArticles:
         """
         return self.dataframe.columns
     
+    @instrument
     def reformat_dataframe(self, rename_dict={}, drop_columns=[], keep=False):
         """
         Drop and rename the self.dataframe.columns.
@@ -173,13 +185,145 @@ class TRArticles:
         
         return reformatted_df
     
+    @instrument
+    def reformat(self, spec, keep=False):
+        """
+        Run all reformatting steps described by spec and return the dataframe in 
+        the 'Article' format.  Same output as filter_language(), remove_duplicate_ids(),
+        remove_internal_calls(), convert_string_to_set(), concatenate_columns() and
+        reformat_dataframe(), but the rows are selected with one combined mask and 
+        each output column is built once (without intermediate dataframe copies).
+        spec is a dict with the (optional) keys:
+            - identifier (str):                 column of story IDs used to remove duplicates
+            - fill_columns (List[str]):         columns filled across duplicate IDs
+            - internal_calls (Dict[str, List]): markers of non-article rows for each column
+            - set_columns (List[str]):          columns converted to sets of strings
+            - concatenate_columns (List[str]):  two text columns concatenated into the first
+            - rename (Dict[str, str]):          new name of each column
+            - drop_columns (List[str]):         columns to drop
+        self.dataframe is only replaced if keep.
+        """
+        
+        identifier = spec.get('identifier')
+        fill_columns = spec.get('fill_columns', []) if identifier is not None else []
+        internal_calls = spec.get('internal_calls', {})
+        set_columns = spec.get('set_columns', [])
+        concat_columns = spec.get('concatenate_columns', [])
+        drop_columns = list(spec.get('drop_columns', []))
+        
+        dataframe = self.dataframe
+        
+        for column in ['LANGUAGE'] + ([identifier] if identifier is not None else []) + \
+                fill_columns + list(internal_calls) + set_columns + concat_columns:
+            if column not in dataframe.columns:
+                raise ValueError('Cannot find ', column, ' column.')
+        
+        if self.verbose:
+            print("Reformatting dataframe...")
+            before_num_rows = dataframe.shape[0]
+        
+        #   positions of rows in the selected languages
+        positions = np.flatnonzero(dataframe['LANGUAGE'].isin(self.languages).to_numpy())
+        
+        #   first row of each identifier, with fill_columns filled across its rows
+        filled = {}
+        if identifier is not None:
+            ids = dataframe[identifier].iloc[positions]
+            is_first = ~ids.duplicated().to_numpy()
+            
+            if fill_columns != []:
+                fill_df = dataframe[fill_columns].iloc[positions].groupby(ids.to_numpy(), 
+                                                                         sort=False).first()
+                fill_df = fill_df.reindex(ids.iloc[is_first].to_numpy())
+            
+            positions = positions[is_first]
+            
+            for column in fill_columns:
+                values = dataframe[column].iloc[positions]
+                filled[column] = values.fillna(pd.Series(fill_df[column].to_numpy(),
+                                                         index=values.index))
+        
+        #   remove internal calls (on the filled values) with one combined mask
+        keep_mask = np.ones(len(positions), dtype=bool)
+        for column, calls in internal_calls.items():
+            if calls == []:
+                continue
+            values = filled[column] if column in filled else dataframe[column].iloc[positions]
+            keep_mask &= ~values.str.startswith(tuple(calls), na=False).to_numpy(dtype=bool)
+        
+        positions = positions[keep_mask]
+        index = dataframe.index[positions]
+        
+        def get_column(column):
+            if column in filled:
+                return filled[column][keep_mask]
+            return dataframe[column].iloc[positions]
+        
+        if concat_columns != []:
+            drop_columns.append(concat_columns[1])
+        
+        #   build each output column once
+        data = {}
+        for column in dataframe.columns:
+            if column in drop_columns:
+                continue
+            
+            if column in set_columns:
+                values = [set(value.split(" ")) for value in get_column(column)]
+            elif concat_columns != [] and column == concat_columns[0]:
+                values = get_column(concat_columns[0]).fillna('').astype(str) + \
+                    get_column(concat_columns[1]).fillna('').astype(str)
+            else:
+                values = get_column(column)
+            
+            data[spec.get('rename', {}).get(column, column)] = values
+        
+        reformatted_df = pd.DataFrame(data, index=index)
+        
+        if self.verbose:
+            after_num_rows = reformatted_df.shape[0]
+            
+            print(before_num_rows-after_num_rows, " rows (", 
+                  round((before_num_rows-after_num_rows)/max(before_num_rows, 1)*100, 2),
+                  "%) were removed.")
+        
+        if keep:
+            self.dataframe = reformatted_df
+            if self.verbose:
+                print("self.dataframe modified.")
+        
+        return reformatted_df
+    
+    @instrument
     def load_dataframe(self, file):
         """
         Read dataframe from .csv file.
         """
         self.dataframe = pd.read_csv(file)
         return 
+    
+    @instrument
+    def load_parquet(self, file, columns=None, date_range=[]):
+        """
+        Read dataframe from .parquet file (written by save_parquet()).  Only columns 
+        (if not None) and rows with DATE within date_range (if not empty) are read.
+        """
+        self.dataframe, _ = read_parquet(file, columns, date_range)
+        return
+    
+    @instrument
+    def save_parquet(self, save_loc="", name="articles_dataframe.parquet"):
+        """
+        Save dataframe to .parquet file.
+        """
+        
+        if save_loc == "":
+            save_loc = "."
         
+        write_parquet(self.dataframe, save_loc+"/"+name)
+        return
+        
+    @instrument
     def save_dataframe(self, save_loc="", name="articles_dataframe.csv"):
         """
         Save dataframe to .csv file.
@@ -189,4 +333,56 @@ class TRArticles:
             self.dataframe.to_csv("./"+name)
         else:
             self.dataframe.to_csv(save_loc+"/"+name)
-        return
\ No newline at end of file
+        return
+
+
+def load_and_reformat(file, spec=None, languages=['en']):
+    """
+    Read a raw TR .csv file and reformat it with TRArticles.reformat(spec) (if spec
+    is not None).  Runs in the worker processes of load_files().
+    """
+    dataframe = pd.read_csv(file)
+    if spec is None:
+        return dataframe
+    
+    return TRArticles(dataframe, languages).reformat(spec)
+
+async def load_files(files, spec=None, languages=['en'], workers=None, executor=None):
+    """
+    Asynchronously read and reformat many raw TR .csv files (e.g., monthly
+    rna002_RTRS_YYYY_MM.csv files) at once on a pool of worker processes, so reading
+    and parsing of different files overlap.  Yields (file, dataframe) in the order 
+    the files are ready (not the order of files).
+    INPUT:
+        - files (List[str]):        raw TR .csv files
+        - spec (dict):              reformatting spec (see TRArticles.reformat()), or None
+                                    to only read the files
+        - languages (List[str]):    languages to keep
+        - workers (int):            number of worker processes (if None, number of CPUs)
+        - executor (Executor):      executor to use instead of a new process pool
+    
+    Usage:
+        async for file, dataframe in load_files(files, spec):
+            ...
+    """
+    
+    loop = asyncio.get_running_loop()
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    
+    try:
+        futures = {}
+        for file in files:
+            future = loop.run_in_executor(executor, load_and_reformat, file, spec, languages)
+            futures[future] = file
+        
+        pending = set(futures)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                yield futures[future], future.result()
+    finally:
+        if own_executor:
+            #   cancel the remaining files if the caller stops early
+            executor.shutdown(wait=False, cancel_futures=True)
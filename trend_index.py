@@ -0,0 +1,646 @@
+"""
+Indices of partial trend scores for a tokenized 'Article'-format Pandas dataframe.
+
+Name:   Arnold YS Yeung
+Date:   2026-10-17
+"""
+
+import json
+import math
+from array import array
+from datetime import date as Date, timedelta
+from collections import defaultdict, Counter, OrderedDict
+from bisect import bisect_left, bisect_right, insort
+
+import numpy as np
+
+
+class TrendPartial:
+    """
+    Unweighted partial trend scores of a set of texts, kept separately for each
+    column so that column weights can be applied when the scores are queried.
+    """
+
+    def __init__(self):
+
+        self.count_score = {}
+        self.text_score = {}
+        self.norm_score = {}
+
+    def add_tokens(self, column, tokens):
+        """
+        Add the tokens of one text in column into the partial scores.
+        """
+
+        if column not in self.count_score:
+            self.count_score[column] = Counter()
+            self.text_score[column] = Counter()
+            self.norm_score[column] = Counter()
+
+        count_score = self.count_score[column]
+        text_score = self.text_score[column]
+        norm_score = self.norm_score[column]
+
+        counts = Counter(tokens)
+        num_tokens = len(tokens)
+
+        count_score.update(counts)
+        text_score.update(counts.keys())
+        for token, count in counts.items():
+            norm_score[token] += count/num_tokens
+
+    def merge(self, other, columns=None):
+        """
+        Add the partial scores of other (of columns, if not None) into these partial 
+        scores.
+        """
+
+        for column in other.count_score:
+            if columns is not None and column not in columns:
+                continue
+            if column not in self.count_score:
+                self.count_score[column] = Counter()
+                self.text_score[column] = Counter()
+                self.norm_score[column] = Counter()
+
+            self.count_score[column].update(other.count_score[column])
+            self.text_score[column].update(other.text_score[column])
+            self.norm_score[column].update(other.norm_score[column])
+
+    def remove_column(self, column):
+        """
+        Remove the partial scores of column.
+        """
+
+        self.count_score.pop(column, None)
+        self.text_score.pop(column, None)
+        self.norm_score.pop(column, None)
+
+    def add_to_scores(self, count_score, text_score, norm_score, column, weight=None):
+        """
+        Add the partial scores of column (scaled by weight) into the given scores.
+        """
+
+        if column not in self.count_score:
+            return
+
+        if weight is None:
+            weight = 1
+
+        for token, count in self.count_score[column].items():
+            count_score[token] += count * weight
+        for token, count in self.text_score[column].items():
+            text_score[token] += count * weight
+        for token, score in self.norm_score[column].items():
+            norm_score[token] += score * weight
+
+
+class DailyTrendIndex:
+    """
+    Partial trend scores of a tokenized dataframe bucketed by DATE.  Scores for a
+    date range are the sum of the buckets within the range, and new articles only
+    update the buckets of their own dates.  The weighted daily scores and window
+    statistics of the last cache_size queries are cached.
+    """
+
+    def __init__(self, cache_size=1024):
+
+        self.days = {}
+        self.dates = []
+        self.columns = set()
+
+        #   LRU cache of weighted daily scores and window statistics (entries of changed
+        #   dates or columns are dropped)
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+
+    def add_dataframe(self, dataframe, columns, decoders={}):
+        """
+        Add the tokenized columns of all rows in dataframe into their day buckets.
+        decoders maps columns to functions converting their cells into token lists
+        (e.g., for interned tokens).
+        """
+
+        for column in columns:
+            if column not in dataframe.columns:
+                raise ValueError('Cannot find ', column, 'column.')
+
+        for date, day_dataframe in dataframe.groupby('DATE', sort=False):
+            self.add_day(date, day_dataframe, columns, decoders)
+
+        self.columns.update(columns)
+        return
+
+    def add_day(self, date, dataframe, columns, decoders={}):
+        """
+        Add the tokenized columns of the rows in dataframe into the bucket of date.
+        """
+
+        if date not in self.days:
+            self.days[date] = TrendPartial()
+            insort(self.dates, date)
+        self._invalidate_cache(date=date)
+
+        partial = self.days[date]
+        for column in columns:
+            decoder = decoders.get(column)
+            for tokens in dataframe[column]:
+                if decoder is not None:
+                    tokens = decoder(tokens)
+                partial.add_tokens(column, tokens)
+        return
+
+    def remove_columns(self, columns):
+        """
+        Remove columns from all day buckets.
+        """
+
+        for column in columns:
+            for partial in self.days.values():
+                partial.remove_column(column)
+            self.columns.discard(column)
+        self._invalidate_cache(columns=columns)
+        return
+
+    def _invalidate_cache(self, date=None, columns=[]):
+        """
+        Drop the cached entries of the days and windows containing date, and of the
+        weighted scores of any of columns.
+        """
+
+        for key in list(self.cache):
+            #   ('day', date, ...) or ('window', min_date, max_date, ...)
+            if key[0] == 'day':
+                key_dates = (key[1], key[1])
+                key_columns = key[2]
+            else:
+                key_dates = (key[1], key[2])
+                key_columns = key[3]
+
+            if (date is not None and key_dates[0] <= date <= key_dates[1]) or \
+                    any(column in key_columns for column in columns):
+                del self.cache[key]
+        return
+
+    def _get_cached(self, key):
+        """
+        Get the cached entry of key (None if not cached), as the most recently used.
+        """
+
+        if key not in self.cache:
+            return None
+        self.cache.move_to_end(key)
+        return self.cache[key]
+
+    def _set_cached(self, key, value):
+        """
+        Cache value under key, dropping the least recently used entries over cache_size.
+        """
+
+        self.cache[key] = value
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return value
+
+    def get_dates(self, min_date, max_date):
+        """
+        Get the dates of all buckets within min_date and max_date inclusively.
+        """
+
+        return self.dates[bisect_left(self.dates, min_date):bisect_right(self.dates, max_date)]
+
+    def compute_trend(self, columns, column_weights=[], date_range=[], scores=None):
+        """
+        Sum the day buckets within date_range into weighted count, text and norm
+        scores.  column_weights are applied as given (i.e., not normalized).  If
+        scores (count, text and norm dicts) is given, the sums are added into it.
+        """
+
+        if scores is None:
+            count_score = defaultdict(int)
+            text_score = defaultdict(int)
+            norm_score = defaultdict(int)
+        else:
+            count_score, text_score, norm_score = scores
+
+        if date_range == []:
+            dates = self.dates
+        else:
+            dates = self.get_dates(date_range[0], date_range[1])
+
+        for date in dates:
+            partial = self.days[date]
+            for i, column in enumerate(columns):
+                if i < len(column_weights):
+                    weight = column_weights[i]
+                else:
+                    weight = None
+                partial.add_to_scores(count_score, text_score, norm_score, column, weight)
+
+        return count_score, text_score, norm_score
+
+    def compute_trends(self, windows, configs):
+        """
+        Compute the weighted count, text and norm scores of each window (date range) 
+        and configuration (columns and column weights, applied as given) from the day
+        buckets.  The buckets of each window are summed once per column for all
+        configurations.  Returns a dict of (min_date, max_date, configuration index) 
+        to a dict of the 'count', 'text' and 'norm' scores.
+        """
+
+        columns = set()
+        for config_columns, _ in configs:
+            columns.update(config_columns)
+
+        trends = {}
+        for min_date, max_date in windows:
+            window = TrendPartial()
+            for date in self.get_dates(min_date, max_date):
+                window.merge(self.days[date], columns)
+
+            for i, (config_columns, column_weights) in enumerate(configs):
+                count_score = defaultdict(int)
+                text_score = defaultdict(int)
+                norm_score = defaultdict(int)
+
+                for j, column in enumerate(config_columns):
+                    if j < len(column_weights):
+                        weight = column_weights[j]
+                    else:
+                        weight = None
+                    window.add_to_scores(count_score, text_score, norm_score, column, weight)
+
+                trends[(min_date, max_date, i)] = {'count': count_score, 'text': text_score,
+                                                   'norm': norm_score}
+
+        return trends
+
+    def get_day_scores(self, date, columns, column_weights=[], method='text'):
+        """
+        Get the weighted scores (of method) of the bucket of date (cached).
+        """
+
+        key = ('day', date, tuple(columns), tuple(column_weights), method)
+        scores = self._get_cached(key)
+        if scores is None:
+            scores = defaultdict(int)
+            partial = self.days.get(date)
+            if partial is not None:
+                partial_scores = getattr(partial, method+'_score')
+                for i, column in enumerate(columns):
+                    weight = column_weights[i] if i < len(column_weights) else 1
+                    for token, score in partial_scores.get(column, {}).items():
+                        scores[token] += score * weight
+            self._set_cached(key, scores)
+
+        return scores
+
+    def get_window_stats(self, min_date, max_date, columns, column_weights=[], method='text'):
+        """
+        Get the mean and standard deviation of the weighted daily scores (of method) of
+        each token over the days within min_date and max_date (days without articles
+        count as 0).  Cached, so that a baseline window is only computed once.
+        """
+
+        key = ('window', min_date, max_date, tuple(columns), tuple(column_weights), method)
+        stats = self._get_cached(key)
+        if stats is None:
+            num_days = self.count_days(min_date, max_date)
+            sums = defaultdict(int)
+            squared_sums = defaultdict(int)
+            for date in self.get_dates(min_date, max_date):
+                for token, score in self.get_day_scores(date, columns, column_weights, method).items():
+                    sums[token] += score
+                    squared_sums[token] += score * score
+
+            means = {}
+            stds = {}
+            for token, total in sums.items():
+                mean = total / num_days
+                means[token] = mean
+                stds[token] = math.sqrt(max(squared_sums[token] / num_days - mean * mean, 0.))
+            stats = self._set_cached(key, (means, stds))
+
+        return stats
+
+    def count_days(self, min_date, max_date):
+        """
+        Count the calendar days within min_date and max_date inclusively (or the
+        buckets within them, if the dates are not ISO formatted).
+        """
+
+        try:
+            num_days = (Date.fromisoformat(str(max_date)[:10]) - 
+                        Date.fromisoformat(str(min_date)[:10])).days + 1
+        except ValueError:
+            num_days = len(self.get_dates(min_date, max_date))
+        return max(num_days, 1)
+
+    def compute_velocity(self, date_range, baseline_range, columns, column_weights=[], 
+                         velocity='ratio', method='text', smoothing=1):
+        """
+        Compute the velocity score of each token in the target date_range against the
+        baseline_range, from the mean daily scores (of method) in each window:
+            - 'ratio':      (target mean + smoothing) / (baseline mean + smoothing)
+            - 'zscore':     (target mean - baseline mean) / (baseline std + smoothing)
+        column_weights are applied as given (i.e., not normalized).
+        """
+
+        if velocity not in ('ratio', 'zscore'):
+            raise ValueError("Invalid velocity.")
+
+        target_means, _ = self.get_window_stats(date_range[0], date_range[1], columns,
+                                                column_weights, method)
+        baseline_means, baseline_stds = self.get_window_stats(baseline_range[0], baseline_range[1],
+                                                              columns, column_weights, method)
+
+        velocity_score = defaultdict(int)
+        for token in list(target_means) + [token for token in baseline_means 
+                                           if token not in target_means]:
+            target_mean = target_means.get(token, 0)
+            baseline_mean = baseline_means.get(token, 0)
+            if velocity == 'ratio':
+                velocity_score[token] = (target_mean + smoothing) / (baseline_mean + smoothing)
+            else:
+                velocity_score[token] = (target_mean - baseline_mean) / \
+                    (baseline_stds.get(token, 0) + smoothing)
+
+        return velocity_score
+
+    @staticmethod
+    def get_baseline_range(date_range, num_days=None):
+        """
+        Get the range of num_days (if None, the length of date_range) days just before
+        date_range (ISO formatted dates).
+        """
+
+        min_date = Date.fromisoformat(str(date_range[0])[:10])
+        if num_days is None:
+            num_days = (Date.fromisoformat(str(date_range[1])[:10]) - min_date).days + 1
+
+        return [str(min_date - timedelta(days=num_days)), str(min_date - timedelta(days=1))]
+
+
+class InvertedIndex:
+    """
+    Postings of each token of the tokenized columns of a dataframe: the positions of
+    the rows (articles) it occurs in and its term frequency in each.  Per-token daily
+    series and top contributing articles only read the postings of the token, not
+    the whole dataframe.
+    """
+
+    def __init__(self):
+
+        self.columns = set()
+        self.postings = {}
+        self.lengths = {}
+        self.ids = []
+        self.row_dates = array('l')
+        self.dates = []
+        self.date_codes = {}
+        self.num_rows = 0
+        self._row_dates = None
+
+    def add_dataframe(self, dataframe, columns, decoders={}, id_column='ID'):
+        """
+        Add the rows of dataframe (appended after the rows already added) into the
+        postings of columns.  decoders maps columns to functions converting their
+        cells into token lists (e.g., for interned tokens).
+        """
+
+        for column in list(columns) + [id_column, 'DATE']:
+            if column not in dataframe.columns:
+                raise ValueError('Cannot find ', column, 'column.')
+
+        if self.num_rows > 0 and set(columns) != self.columns:
+            raise ValueError('Mismatched columns.')
+
+        start = self.num_rows
+        for date in dataframe['DATE']:
+            if date not in self.date_codes:
+                self.date_codes[date] = len(self.dates)
+                self.dates.append(date)
+            self.row_dates.append(self.date_codes[date])
+        self.ids += list(dataframe[id_column])
+
+        for column in columns:
+            postings = self.postings.setdefault(column, {})
+            lengths = self.lengths.setdefault(column, array('l'))
+            decoder = decoders.get(column)
+
+            for row, tokens in enumerate(dataframe[column], start):
+                if decoder is not None:
+                    tokens = decoder(tokens)
+                lengths.append(len(tokens))
+
+                for token, count in Counter(tokens).items():
+                    if token not in postings:
+                        postings[token] = (array('q'), array('l'))
+                    rows, counts = postings[token]
+                    rows.append(row)
+                    counts.append(count)
+
+        self.columns.update(columns)
+        self.num_rows += dataframe.shape[0]
+        self._row_dates = None
+        return
+
+    def remove_columns(self, columns):
+        """
+        Remove the postings of columns.
+        """
+
+        for column in columns:
+            self.postings.pop(column, None)
+            self.lengths.pop(column, None)
+            self.columns.discard(column)
+        return
+
+    def get_postings(self, token, column, method='count'):
+        """
+        Get the row positions of the articles of token in column and the score (of
+        method) of token in each.
+        """
+
+        if method not in ('count', 'text', 'norm'):
+            raise ValueError("Invalid method.")
+        if column not in self.postings:
+            raise ValueError('Cannot find ', column, 'column.')
+
+        if token not in self.postings[column]:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+
+        rows, counts = self.postings[column][token]
+        rows = np.array(rows, dtype=np.int64)
+        if method == 'count':
+            scores = np.array(counts, dtype=np.float64)
+        elif method == 'text':
+            scores = np.ones(len(rows))
+        else:
+            lengths = self.lengths[column]
+            scores = np.array(counts, dtype=np.float64) / \
+                np.array([lengths[row] for row in rows.tolist()], dtype=np.float64)
+        return rows, scores
+
+    def _get_weighted_postings(self, token, columns, column_weights=[], method='count', 
+                               date_range=[]):
+        """
+        Get the row positions and weighted scores of token over all columns.
+        """
+
+        all_rows = []
+        all_scores = []
+        for i, column in enumerate(columns):
+            rows, scores = self.get_postings(token, column, method)
+            if i < len(column_weights):
+                scores = scores * column_weights[i]
+            all_rows.append(rows)
+            all_scores.append(scores)
+
+        rows = np.concatenate(all_rows) if all_rows != [] else np.zeros(0, dtype=np.int64)
+        scores = np.concatenate(all_scores) if all_scores != [] else np.zeros(0)
+
+        if date_range != []:
+            codes = self._get_row_dates()[rows]
+            dates = np.array(self.dates, dtype=object)[codes]
+            mask = (dates >= date_range[0]) & (dates <= date_range[1])
+            rows = rows[mask.astype(bool)]
+            scores = scores[mask.astype(bool)]
+
+        return rows, scores
+
+    def _get_row_dates(self):
+        if self._row_dates is None:
+            self._row_dates = np.array(self.row_dates, dtype=np.int64)
+        return self._row_dates
+
+    def get_series(self, token, columns, column_weights=[], method='count', date_range=[]):
+        """
+        Get the daily scores (of method) of token as a list of (date, score) sorted by
+        date.  Dates without the token are left out.  column_weights are applied as
+        given (i.e., not normalized).
+        """
+
+        rows, scores = self._get_weighted_postings(token, columns, column_weights, method, 
+                                                   date_range)
+        totals = np.bincount(self._get_row_dates()[rows], weights=scores, 
+                             minlength=len(self.dates))
+
+        return sorted((self.dates[code], float(totals[code])) 
+                      for code in np.flatnonzero(totals).tolist())
+
+    def get_top_articles(self, token, columns, column_weights=[], method='count', n=10, 
+                         date_range=[]):
+        """
+        Get the n articles contributing the most to the score (of method) of token as
+        a list of (article ID, date, score), in descending order of score.
+        """
+
+        rows, scores = self._get_weighted_postings(token, columns, column_weights, method, 
+                                                   date_range)
+        rows, inverse = np.unique(rows, return_inverse=True)
+        totals = np.bincount(inverse, weights=scores, minlength=len(rows))
+
+        if n < len(totals):
+            top = np.argpartition(-totals, n)[:n]
+        else:
+            top = np.arange(len(totals))
+        #   ties are in the order of the rows
+        top = top[np.lexsort((rows[top], -totals[top]))]
+
+        row_dates = self._get_row_dates()
+        return [(self.ids[row], self.dates[row_dates[row]], float(totals[i])) 
+                for i, row in zip(top.tolist(), rows[top].tolist())]
+
+
+class TrendSnapshot(TrendPartial):
+    """
+    Partial trend scores of a shard of articles (e.g., one date range or one file)
+    which can be merged with the snapshots of other shards.  The unweighted count
+    and text scores of merged snapshots are exactly those of scoring the union of
+    the shards.  Column weights are only applied when the merged scores are
+    computed, so weighted scores (and norm scores) are equal up to floating-point
+    summation order.
+    """
+
+    def __init__(self, min_date=None, max_date=None):
+
+        TrendPartial.__init__(self)
+        self.min_date = min_date
+        self.max_date = max_date
+        self.num_texts = Counter()
+
+    def add_tokens(self, column, tokens):
+        """
+        Add the tokens of one text in column into the partial scores.
+        """
+
+        TrendPartial.add_tokens(self, column, tokens)
+        self.num_texts[column] += 1
+
+    def merge(self, other, columns=None):
+        """
+        Add the partial scores (and date range) of other into this snapshot.
+        """
+
+        TrendPartial.merge(self, other, columns)
+        self.num_texts.update(other.num_texts)
+
+        if other.min_date is not None and (self.min_date is None or other.min_date < self.min_date):
+            self.min_date = other.min_date
+        if other.max_date is not None and (self.max_date is None or other.max_date > self.max_date):
+            self.max_date = other.max_date
+
+    def __add__(self, other):
+
+        snapshot = TrendSnapshot()
+        snapshot.merge(self)
+        snapshot.merge(other)
+        return snapshot
+
+    def compute_trend(self, columns, column_weights=[]):
+        """
+        Compute the weighted count, text and norm scores.  column_weights are applied
+        as given (i.e., not normalized).
+        """
+
+        count_score = defaultdict(int)
+        text_score = defaultdict(int)
+        norm_score = defaultdict(int)
+
+        for i, column in enumerate(columns):
+            if i < len(column_weights):
+                weight = column_weights[i]
+            else:
+                weight = None
+            self.add_to_scores(count_score, text_score, norm_score, column, weight)
+
+        return count_score, text_score, norm_score
+
+    def save(self, file):
+        """
+        Save the snapshot to a .json file.
+        """
+
+        with open(file, 'w') as fp:
+            json.dump({'min_date': self.min_date, 'max_date': self.max_date,
+                       'num_texts': self.num_texts, 'count_score': self.count_score,
+                       'text_score': self.text_score, 'norm_score': self.norm_score}, fp)
+
+    @classmethod
+    def load(cls, file):
+        """
+        Load a snapshot from a .json file (written by save()).
+        """
+
+        with open(file, 'r') as fp:
+            data = json.load(fp)
+
+        snapshot = cls(data['min_date'], data['max_date'])
+        snapshot.num_texts = Counter(data['num_texts'])
+        for column in data['count_score']:
+            snapshot.count_score[column] = Counter(data['count_score'][column])
+            snapshot.text_score[column] = Counter(data['text_score'][column])
+            snapshot.norm_score[column] = Counter(data['norm_score'][column])
+        return snapshot
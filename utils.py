@@ -6,6 +6,12 @@ Date:   2020-12-11
 """
 
 import re
+import html
+import json
+
+#   precompiled patterns of the text normalizer
+_PUNCTUATION_PATTERN = re.compile(r'[^0-9a-zA-Z]+')
+_URL_PATTERN = re.compile(r' (?:http|www)[^ ]*')
 
 
 def get_words_from_file(file):
@@ -20,16 +26,97 @@ def get_words_from_file(file):
     
     return words
 
+def remove_url(text):
+    """
+    Remove URLs starting with http or www from text. (Assumes URL is surrounded
+    by " ")
+    """
+    if 'http' not in text and 'www' not in text:
+        return text
+    
+    #   with a leading " ", every token starts after a " " and each URL is removed 
+    #   together with the " " before it (same as splitting and joining on " ")
+    return _URL_PATTERN.sub('', ' ' + text)[1:]
+
+def remove_noise(text):
+    """
+    Remove common noise in text. (E.g., '\n', '\t', HTML, URLs)
+    """
+    text = text.replace('\n', '').replace('\t', '')
+    
+    #   html.unescape() returns text as is if it has no '&'
+    text = html.unescape(text)
+    
+    return remove_url(text)
+
+def normalize_text(text, replacement=" ", lower=True):
+    """
+    Remove noise, replace punctuations and lowercase a string in one call with 
+    precompiled patterns (each step is still its own scan of the string, but without
+    splitting and joining tokens).  Same output as 
+    replace_punctuations(remove_noise(text)) (lowercased).
+    """
+    text = remove_noise(text)
+    text = _PUNCTUATION_PATTERN.sub(replacement, text)
+    
+    if lower:
+        return text.lower()
+    return text
+
+class StopWordFilter:
+    """
+    Set of stop words which also rejects tokens containing digits.  Membership is a
+    set lookup, and the filter pickles as a single frozenset (cheap to send to
+    worker processes).
+    """
+    
+    digit_pattern = re.compile(r'[0-9]')
+    
+    def __init__(self, words=[]):
+        self.words = frozenset(words)
+    
+    @classmethod
+    def from_files(cls, files):
+        """
+        Create a filter from files where each line is a stop word.
+        """
+        words = []
+        for file in files:
+            words += get_words_from_file(file)
+        return cls(words)
+    
+    def __contains__(self, token):
+        return token in self.words or self.digit_pattern.search(token) is not None
+    
+    def __len__(self):
+        return len(self.words)
+    
+    def __reduce__(self):
+        return (self.__class__, (self.words,))
+    
+    def filter(self, tokens):
+        """
+        Remove all stop words (and tokens containing digits) from a list of tokens.
+        """
+        words = self.words
+        search = self.digit_pattern.search
+        
+        #   isalpha() is a fast path for tokens without digits
+        return [token for token in tokens if token not in words 
+                and (token.isalpha() or search(token) is None)]
+
 def replace_punctuations(text, replacement=" "):
     """
     Replace punctuations in string with replacement.
     """
-    return re.sub(r'[^0-9a-zA-Z]+', replacement, text)
+    return _PUNCTUATION_PATTERN.sub(replacement, text)
     
 def tokenize(text, sep=None, lower=True):
     """
     Tokenize a string.
     """    
+    if not lower:
+        return text.strip().split(sep)
     if sep is not None:    
         return [token.lower() for token in text.strip().split(sep)]
     return [token.lower() for token in text.strip().split()]
@@ -38,11 +125,107 @@ def remove_stop_words(tokens, stop_words=set()):
     """
     Remove all stop words (and tokens containing digits) from a list of tokens.
     """
+    if isinstance(stop_words, StopWordFilter):
+        return stop_words.filter(tokens)
+    
     digits = ('1', '2', '3', '4', '5', '6', '7', '8', '9', '0')
     
     return [token for token in tokens if token not in stop_words 
             and not any(digit in token for digit in digits)]
 
+def preprocess_text(text, stop_words=None, replacement=" ", sep=None, lower=True):
+    """
+    Remove noise, replace punctuations, tokenize and remove stop words (if 
+    stop_words is not None) of a string in one call (see normalize_text()).
+    """
+    #   tokens are already lowercased by the normalizer
+    tokens = normalize_text(text, replacement, lower).strip().split(sep)
+    if stop_words is not None:
+        tokens = remove_stop_words(tokens, stop_words)
+    
+    return tokens
+
+#   stop words of each preprocessing worker process (set once by the pool initializer)
+_worker_stop_words = None
+
+def init_preprocess_worker(stop_words=None):
+    """
+    Initialize a preprocessing worker process with the stop words.
+    """
+    global _worker_stop_words
+    _worker_stop_words = stop_words
+
+def preprocess_chunk(texts, replacement=" ", sep=None, lower=True):
+    """
+    Preprocess a chunk of strings with preprocess_text() and the stop words of
+    the worker process.
+    """
+    return [preprocess_text(text, _worker_stop_words, replacement, sep, lower) 
+            for text in texts]
+
+#   key of the word-trends metadata in the Parquet schema
+_PARQUET_METADATA_KEY = b'word_trends'
+
+def write_parquet(dataframe, file, tokenized_columns=[]):
+    """
+    Write a dataframe to a Parquet file.  Columns of lists (e.g., tokens) are stored
+    natively as lists and columns of sets are stored as sorted lists.  The names of
+    the tokenized and set columns are kept in the file metadata.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    set_columns = []
+    for column in dataframe.columns:
+        values = dataframe[column].dropna()
+        if dataframe[column].dtype == object and values.shape[0] > 0 \
+                and isinstance(values.iloc[0], (set, frozenset)):
+            set_columns.append(column)
+    
+    if set_columns != []:
+        dataframe = dataframe.assign(**{column: [sorted(value) if isinstance(value, (set, frozenset)) 
+                                                 else value for value in dataframe[column]]
+                                        for column in set_columns})
+    
+    table = pa.Table.from_pandas(dataframe)
+    metadata = dict(table.schema.metadata or {})
+    metadata[_PARQUET_METADATA_KEY] = json.dumps({'tokenized_columns': list(tokenized_columns),
+                                                  'set_columns': set_columns})
+    pq.write_table(table.replace_schema_metadata(metadata), file)
+
+def read_parquet(file, columns=None, date_range=[]):
+    """
+    Read a dataframe written by write_parquet().  Only columns (if not None) and
+    rows with DATE within date_range (inclusively, if not empty) are read.  Returns
+    the dataframe and the names of its tokenized columns.
+    """
+    import pyarrow.parquet as pq
+    
+    filters = None
+    if date_range != []:
+        filters = [('DATE', '>=', date_range[0]), ('DATE', '<=', date_range[1])]
+    
+    table = pq.read_table(file, columns=columns, filters=filters)
+    metadata = (table.schema.metadata or {}).get(_PARQUET_METADATA_KEY)
+    if metadata is None:
+        metadata = {'tokenized_columns': [], 'set_columns': []}
+    else:
+        metadata = json.loads(metadata)
+    
+    dataframe = table.to_pandas()
+    
+    #   lists are read as arrays
+    tokenized_columns = [column for column in metadata['tokenized_columns'] 
+                         if column in dataframe.columns]
+    for column in tokenized_columns:
+        dataframe[column] = [list(tokens) for tokens in dataframe[column]]
+    for column in metadata['set_columns']:
+        if column in dataframe.columns:
+            dataframe[column] = [set(value) if value is not None else value 
+                                 for value in dataframe[column]]
+    
+    return dataframe, tokenized_columns
+
 def lemmatize(tokens):
     raise NotImplementedError()
     
\ No newline at end of file